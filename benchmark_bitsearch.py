@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for bitsearch.py qBittorrent plugin
+Usage: python benchmark_bitsearch.py [benchmark] [size]
+
+Benchmarks:
+  index   query latency of the local result index (default 1,000,000 entries)
+  pool    process-pool parsing on 1, 2, 4 and 8 workers (default 400 pages)
+  bytes   str parsing of decoded pages vs byte-level parsing of raw bodies
+  batch   per-dict filtering and sorting vs columnar batches (default 10,000 rows)
+  replay  parsers and a full search over the recorded pages in $BITSEARCH_FIXTURES
+          (record an archive with BITSEARCH_FIXTURE_MODE=record)
+"""
+
+import sys
+import os
+import base64
+import html
+import random
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+
+# Add current directory to path so we can import the plugin and the test stubs
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Stand in for qBittorrent's helpers and novaprinter, as the tests do
+from plugin_stubs import install_plugin_stubs
+
+install_plugin_stubs()
+
+from bitsearch import (BitSearchParser, FixtureTransport, HostRateLimiter, PageFetcher, ParsePool, ResultBatch,
+                       ResultFilter, ResultIndex, bitsearch)
+
+WORDS = ['ubuntu', 'debian', 'fedora', 'arch', 'mint', 'desktop', 'server', 'amd64', 'arm64',
+         'iso', 'live', 'netinst', 'minimal', 'lts', 'beta', 'release', 'x264', '1080p', '720p',
+         'bluray', 'webrip', 'hevc', 'flac', 'mp3', 'epub', 'pdf', 'complete', 'season', 'remux']
+
+
+def synthetic_results(count, seed=1):
+    """Deterministic plugin-format result dicts with random names and stats"""
+    rng = random.Random(seed)
+    for i in range(count):
+        name = '.'.join(rng.sample(WORDS, 4)) + f".{rng.randint(1, 30)}.{rng.randint(0, 12):02d}"
+        infohash = f"{i:040X}"
+        yield {
+            'link': f"magnet:?xt=urn:btih:{infohash}",
+            'name': name,
+            'size': str(rng.randint(1, 50) * 1024 ** 3),
+            'seeds': str(rng.randint(0, 5000)),
+            'leech': str(rng.randint(0, 500)),
+            'engine_url': 'https://bitsearch.to',
+            'desc_link': f"https://bitsearch.to/torrent/{infohash[:24].lower()}",
+            'pub_date': str(1500000000 + i)
+        }
+
+
+def synthetic_page(results):
+    """Render results in bitsearch.to list markup, padded like the real site"""
+    blocks = ['<html><head><title>Search</title></head><body><div class="container">']
+    for result in results:
+        size_gb = int(result['size']) / 1024 ** 3
+        blocks.append(f'''
+<li class="card search-result my-2">
+  <div class="info px-3 pt-2 pb-3">
+    <h3 class="title w-100 truncate"><a href="{result['desc_link'][len('https://bitsearch.to'):]}">{result['name']}</a></h3>
+    <div class="category-stats">
+      <a href="/search?category=1&amp;subcat=2" class="category">Other/DiskImage</a>
+    </div>
+    <div class="stats">
+      <div><img src="/icons/download.svg" alt="Size">{size_gb:.2f} GB</div>
+      <div><img src="/icons/seeder.svg" alt="Seeder"><font color="#0AB49A">{result['seeds']} seeders</font></div>
+      <div><img src="/icons/leecher.svg" alt="Leecher"><font color="#C35257">{result['leech']} leechers</font></div>
+      <div><img src="/icons/calendar.svg" alt="Date">4/18/2019</div>
+    </div>
+  </div>
+  <div class="links center-flex px-3">
+    <a class="dl-torrent" href="{result['link']}" title="Magnet">Magnet</a>
+  </div>
+</li>''')
+    blocks.append('<div class="pagination"><a href="?page=2">2</a></div></div></body></html>')
+    return ''.join(blocks)
+
+
+def synthetic_pages(count, rows=50):
+    results = list(synthetic_results(count * rows))
+    return [synthetic_page(results[i:i + rows]) for i in range(0, len(results), rows)]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+
+def benchmark_index(size=1000000):
+    """Fill an index with synthetic results and time typical queries"""
+    with tempfile.TemporaryDirectory() as directory:
+        index = ResultIndex(os.path.join(directory, 'index.sqlite3'))
+        print(f"FTS5 available: {index.fts}")
+
+        start = time.perf_counter()
+        batch = []
+        for result in synthetic_results(size):
+            batch.append(result)
+            if len(batch) == 10000:
+                index.add(batch)
+                batch = []
+        if batch:
+            index.add(batch)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {size:,} results in {elapsed:.1f}s ({size / elapsed:,.0f}/s)")
+
+        queries = ['ubuntu', 'ubuntu desktop', 'debian netinst amd64', 'flac complete', 'hevc 1080p remux',
+                   'nothingmatches']
+        for query in queries:
+            samples = []
+            for _ in range(20):
+                start = time.perf_counter()
+                hits = index.search(query, limit=100)
+                samples.append(time.perf_counter() - start)
+            print(f"  {query!r:26} {len(hits):3} hits  p50 {percentile(samples, 50) * 1000:7.2f}ms"
+                  f"  p95 {percentile(samples, 95) * 1000:7.2f}ms")
+
+
+def benchmark_pool(pages=400):
+    """Parse synthetic pages inline and on process pools of 1, 2, 4 and 8 workers"""
+    corpus = synthetic_pages(pages)
+    megabytes = sum(len(page) for page in corpus) / 1024 ** 2
+    print(f"{pages} pages, {megabytes:.1f} MB, {os.cpu_count()} CPUs available")
+
+    baseline = None
+    for workers in (0, 1, 2, 4, 8):
+        pool = ParsePool(workers)
+        try:
+            # Start the workers before timing
+            list(pool.map(corpus[:workers]))
+            start = time.perf_counter()
+            parsed = sum(len(records) for records in pool.map(corpus))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.close()
+        baseline = baseline or elapsed
+        label = 'inline' if workers == 0 else f"{workers} workers"
+        print(f"  {label:10} {parsed:7} results  {pages / elapsed:8.1f} pages/s  x{baseline / elapsed:.2f}")
+
+
+def benchmark_bytes(pages=100):
+    """Decode-and-parse against parse_bytes on the raw response bodies"""
+    bodies = [page.encode('utf-8') for page in synthetic_pages(pages)]
+    megabytes = sum(len(body) for body in bodies) / 1024 ** 2
+    print(f"{pages} pages, {megabytes:.1f} MB")
+
+    def parse_str(body):
+        parser = BitSearchParser()
+        parser.parse_html(html.unescape(body.decode('utf-8')))
+        return parser.results
+
+    def parse_raw(body):
+        parser = BitSearchParser()
+        parser.parse_html(memoryview(body))
+        return parser.results
+
+    for label, parse in (('str', parse_str), ('bytes', parse_raw)):
+        start = time.perf_counter()
+        parsed = sum(len(parse(body)) for body in bodies)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        parse(bodies[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:6} {parsed:6} results  {megabytes / elapsed:6.1f} MB/s"
+              f"  peak {peak / 1024:7.1f} KiB per {len(bodies[0]) / 1024:.0f} KiB page")
+
+
+def benchmark_batch(rows=10000):
+    """Filter and sort rows through result dicts and through a ResultBatch, loose and selective filters"""
+    bodies = [page.encode('utf-8') for page in synthetic_pages(rows // 50)]
+    print(f"{len(bodies) * 50} rows on {len(bodies)} pages")
+
+    def per_dict(filters):
+        results = []
+        for body in bodies:
+            parser = BitSearchParser()
+            parser.parse_html(body)
+            results.extend(result for result in parser.results
+                           if int(result['seeds']) >= filters['min_seeds']
+                           and filters['min_size'] <= int(result['size']) <= filters['max_size'])
+        results.sort(key=lambda result: int(result['seeds']), reverse=True)
+        return results
+
+    def columnar(filters):
+        batch = ResultBatch()
+        for body in bodies:
+            BitSearchParser().parse_batch(body, batch)
+        return batch.filter(ResultFilter(**filters)).sort_by_seeds().results()
+
+    for filters in ({'min_seeds': 1000, 'min_size': 5 * 1024 ** 3, 'max_size': 40 * 1024 ** 3},
+                    {'min_seeds': 4500, 'min_size': 10 * 1024 ** 3, 'max_size': 20 * 1024 ** 3}):
+        print(f"  filters {filters}")
+        assert per_dict(filters) == columnar(filters)
+        for label, run in (('per-dict', per_dict), ('batch', columnar)):
+            samples = []
+            for _ in range(5):
+                start = time.perf_counter()
+                results = run(filters)
+                samples.append(time.perf_counter() - start)
+            tracemalloc.start()
+            run(filters)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"    {label:9} {len(results):5} kept  p50 {percentile(samples, 50) * 1000:8.1f}ms"
+                  f"  peak {peak / 1024 ** 2:6.1f} MiB")
+
+
+def benchmark_replay(repeat=3):
+    """Parse recorded real pages with both parsers, then replay full searches with and without latency"""
+    path = os.environ.get('BITSEARCH_FIXTURES')
+    if not path:
+        print("Set BITSEARCH_FIXTURES to a recorded archive to run this benchmark")
+        return
+
+    replay = FixtureTransport(path)
+    pages = [(url, base64.b64decode(entry['body']), entry)
+             for url, entries in replay.recordings.items() for entry in entries if entry['status'] == 200]
+    megabytes = sum(len(body) for _, body, _ in pages) / 1024 ** 2
+    print(f"{len(pages)} recorded pages, {megabytes:.1f} MB")
+
+    for label, parse in (('str', lambda body, charset: BitSearchParser().parse_html(
+                                  html.unescape(body.decode(charset, 'replace')))),
+                         ('bytes', lambda body, charset: BitSearchParser().parse_html(body, charset))):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for _, body, entry in pages:
+                parse(body, entry['charset'])
+        elapsed = time.perf_counter() - start
+        print(f"  parse {label:6} {megabytes * repeat / elapsed:6.1f} MB/s")
+
+    queries = sorted({urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get('q', [''])[0]
+                      for url, _, _ in pages} - {''})
+    for reproduce_latency in (False, True):
+        plugin = bitsearch()
+        # Archives recorded against a mirror or stand-in replay under its base URL
+        parts = urllib.parse.urlsplit(pages[0][0])
+        plugin.url = f"{parts.scheme}://{parts.netloc}"
+        plugin.fetcher = PageFetcher(transport=FixtureTransport(path, reproduce_latency=reproduce_latency),
+                                     limiter=HostRateLimiter(rate=1000, capacity=100))
+        start = time.perf_counter()
+        for query in queries:
+            plugin.search(query, cached=False, sink=lambda result: None)
+        elapsed = time.perf_counter() - start
+        label = 'recorded latency' if reproduce_latency else 'no latency'
+        print(f"  search {label:16} {len(queries)} queries in {elapsed:.2f}s")
+
+
+BENCHMARKS = {
+    'index': benchmark_index,
+    'pool': benchmark_pool,
+    'bytes': benchmark_bytes,
+    'batch': benchmark_batch,
+    'replay': benchmark_replay,
+}
+
+
+def main():
+    names = [sys.argv[1]] if len(sys.argv) > 1 else list(BENCHMARKS)
+    args = [int(arg) for arg in sys.argv[2:]]
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}", file=sys.stderr)
+            return False
+        print(f"=== {name} ===")
+        BENCHMARKS[name](*args)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
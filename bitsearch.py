@@ -3,13 +3,1319 @@
 #LICENSING INFORMATION: Public Domain
 
 from html.parser import HTMLParser
-from helpers import retrieve_url, download_file
+from helpers import download_file
 from novaprinter import prettyPrinter
+import array
+import base64
+import bisect
+import collections
+import concurrent.futures
+import csv
+import email.utils
+import gzip
+import hashlib
+import heapq
+import html
+import http.client
+import io
+import json
+import mmap
+import os
+import queue
+import random
 import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
 import urllib.parse
+import urllib.request
+import zlib
 
 
-class bitsearch(object):
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms for the search pipeline.
+    Rendered in the Prometheus text exposition format.
+    """
+
+    counters = {
+        'searches_total': 'Searches started',
+        'pages_fetched_total': 'Result pages fetched',
+        'bytes_downloaded_total': 'Response bytes downloaded',
+        'results_emitted_total': 'Results passed to prettyPrinter',
+        'duplicates_dropped_total': 'Results dropped as duplicates',
+        'cache_hits_total': 'Pages or results served from a cache',
+        'fallback_parser_total': 'Pages parsed with the fallback extractor',
+        'errors_total': 'Fetch or parse errors',
+        'retries_total': 'Page fetches retried after a failure',
+        'throttled_total': 'Responses rejected with HTTP 429',
+        'circuit_open_total': 'Fetches rejected by an open circuit breaker',
+        'hedges_fired_total': 'Duplicate requests sent for slow page fetches',
+        'hedges_won_total': 'Hedged requests that answered before the original',
+        'filtered_total': 'Results dropped by client-side filters',
+    }
+    histograms = {
+        'fetch_seconds': 'Page fetch latency',
+        'parse_seconds': 'Page parse latency',
+    }
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix='bitsearch'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zero every counter and histogram"""
+        with self.lock:
+            self.values = dict.fromkeys(self.counters, 0)
+            self.observations = {
+                name: {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+                for name in self.histograms
+            }
+
+    def inc(self, name, value=1):
+        """Increment a counter"""
+        with self.lock:
+            self.values[name] += value
+
+    def observe(self, name, seconds):
+        """Record one latency sample in a histogram"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.observations[name]
+            histogram['buckets'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def timer(self, name):
+        """Context manager observing the duration of its block"""
+        return _MetricsTimer(self, name)
+
+    def render(self):
+        """Return all metrics in Prometheus text format"""
+        lines = []
+        with self.lock:
+            for name, help_text in self.counters.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} counter")
+                lines.append(f"{full_name} {self.values[name]}")
+
+            for name, help_text in self.histograms.items():
+                full_name = f"{self.prefix}_{name}"
+                histogram = self.observations[name]
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} histogram")
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{full_name}_bucket{{le="+Inf"}} {histogram["count"]}')
+                lines.append(f"{full_name}_sum {histogram['sum']:.6f}")
+                lines.append(f"{full_name}_count {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write metrics for the node_exporter textfile collector"""
+        write_atomic(path, self.render().encode('utf-8'))
+
+    def serve(self, port=9477, host='127.0.0.1'):
+        """Serve /metrics over HTTP from a daemon thread and return the server"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+class _MetricsTimer:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Shared by every plugin instance in the process
+METRICS = MetricsRegistry()
+
+
+
+def state_dir():
+    """Directory for state shared between plugin invocations"""
+    path = os.environ.get('BITSEARCH_STATE_DIR')
+    if not path:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(cache_home, 'bitsearch')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_atomic(path, data):
+    """Replace path with data (bytes) without exposing a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0'
+DEFAULT_TIMEOUT = 30
+
+
+class ReadTimeoutHTTPConnection(http.client.HTTPConnection):
+    """Connection whose socket switches to read_timeout once connected"""
+
+    def __init__(self, *args, read_timeout=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class ReadTimeoutHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS twin of ReadTimeoutHTTPConnection"""
+
+    def __init__(self, *args, read_timeout=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class ReadTimeoutHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, read_timeout):
+        super().__init__()
+        self.read_timeout = read_timeout
+
+    def http_open(self, req):
+        return self.do_open(ReadTimeoutHTTPConnection, req, read_timeout=self.read_timeout)
+
+
+class ReadTimeoutHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, read_timeout):
+        super().__init__()
+        self.read_timeout = read_timeout
+
+    def https_open(self, req):
+        return self.do_open(ReadTimeoutHTTPSConnection, req, context=self._context,
+                            read_timeout=self.read_timeout)
+
+
+def http_open(url, timeout=None):
+    """
+    Send a GET for url and return the open response. timeout is one number
+    for every socket operation, or a (connect, read) pair: connect bounds
+    establishing the connection, read bounds each wait for data afterwards,
+    so a slow page that keeps sending is not cut off.
+    """
+    request = urllib.request.Request(url, headers={
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': 'gzip, deflate',
+    })
+    if isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+        opener = urllib.request.build_opener(ReadTimeoutHTTPHandler(read_timeout),
+                                             ReadTimeoutHTTPSHandler(read_timeout))
+        return opener.open(request, timeout=connect_timeout)
+    return urllib.request.urlopen(request, timeout=timeout or DEFAULT_TIMEOUT)
+
+
+def decompress_body(data, content_encoding):
+    if content_encoding == 'gzip':
+        return gzip.decompress(data)
+    if content_encoding == 'deflate':
+        return zlib.decompress(data)
+    return data
+
+
+def http_get_bytes(url, timeout=None):
+    """Fetch a page and return its decompressed body and charset, undecoded"""
+    with http_open(url, timeout) as response:
+        data = response.read()
+        content_encoding = response.headers.get('Content-Encoding', '')
+        charset = response.headers.get_content_charset() or 'utf-8'
+
+    # Count what went over the wire, before decompression
+    METRICS.inc('bytes_downloaded_total', len(data))
+    return decompress_body(data, content_encoding), charset
+
+
+def utf8_body(data, charset):
+    """A decompressed body as UTF-8 bytes, transcoding only other charsets"""
+    if charset.lower() in ('utf-8', 'utf8'):
+        return data
+    return data.decode(charset, 'replace').encode('utf-8')
+
+
+def http_get_body(url, timeout=None):
+    """
+    Fetch a page like helpers.retrieve_url, but raise on HTTP errors so
+    callers can see the status code and Retry-After header, and return the
+    raw UTF-8 body: the byte-level parser decodes and unescapes only the
+    fields it extracts, not the whole page.
+    """
+    return utf8_body(*http_get_bytes(url, timeout))
+
+
+class FixtureTransport:
+    """
+    Record/replay layer around the HTTP transport for deterministic offline
+    runs, usable as a PageFetcher transport.
+
+    In 'record' mode every request goes to the network and its response
+    (status, headers, decompressed body, charset and elapsed time) is
+    appended to a gzip-compressed JSON-lines archive at path. In 'replay'
+    mode responses come from the archive instead, repeated URLs in the
+    order they were recorded, and recorded HTTP errors are raised again.
+    With reproduce_latency, replayed responses take as long as they did
+    when recorded.
+
+    Setting BITSEARCH_FIXTURES (and BITSEARCH_FIXTURE_MODE, 'replay' by
+    default) makes the plugin use one for all its searches.
+    """
+
+    # Recorded headers that describe the wire encoding, not the stored body
+    dropped_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, path, mode='replay', reproduce_latency=False):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown fixture mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.reproduce_latency = reproduce_latency
+        self.lock = threading.Lock()
+        self.recordings = collections.defaultdict(list)
+        self.replayed = collections.Counter()
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry['url']].append(entry)
+
+    def __call__(self, url, timeout=None):
+        """Like http_get_body: the raw UTF-8 body"""
+        return utf8_body(*self.get_bytes(url, timeout))
+
+    def get_bytes(self, url, timeout=None):
+        """Like http_get_bytes: (decompressed body, charset)"""
+        if self.mode == 'record':
+            entry = self.record(url, timeout)
+        else:
+            entry = self.replay(url)
+        body = base64.b64decode(entry['body'])
+        if entry['status'] >= 400:
+            headers = http.client.HTTPMessage()
+            for name, value in entry['headers']:
+                headers[name] = value
+            raise urllib.error.HTTPError(url, entry['status'], 'Recorded error', headers, io.BytesIO(body))
+        return body, entry['charset']
+
+    def record(self, url, timeout):
+        start = time.perf_counter()
+        try:
+            with http_open(url, timeout) as response:
+                status, headers, data = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, data = e.code, e.headers, e.read()
+        METRICS.inc('bytes_downloaded_total', len(data))
+        entry = {
+            'url': url,
+            'status': status,
+            'headers': [(name, value) for name, value in headers.items()
+                        if name.lower() not in self.dropped_headers],
+            'charset': headers.get_content_charset() or 'utf-8',
+            'seconds': time.perf_counter() - start,
+            'body': base64.b64encode(decompress_body(data, headers.get('Content-Encoding', ''))).decode('ascii'),
+        }
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        with self.lock:
+            # Each append is a gzip member of its own; gzip.open reads them back as one stream
+            with open(self.path, 'ab') as f:
+                f.write(gzip.compress(line))
+        return entry
+
+    def replay(self, url):
+        with self.lock:
+            entries = self.recordings.get(url)
+            if not entries:
+                raise LookupError(f"No recorded response for {url}")
+            # Repeated requests walk through the recordings, then keep the last
+            entry = entries[min(self.replayed[url], len(entries) - 1)]
+            self.replayed[url] += 1
+        if self.reproduce_latency:
+            time.sleep(entry['seconds'])
+        return entry
+
+
+class FetchError(Exception):
+    """A page fetch that failed after all permitted retries"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitOpenError(FetchError):
+    """Raised instead of fetching while a host's circuit breaker is open"""
+
+
+class DeadlineExceeded(FetchError):
+    """Raised when the search deadline leaves no time for another request"""
+
+
+class Deadline:
+    """Wall-clock budget for one search; unbounded when budget_ms is None"""
+
+    def __init__(self, budget_ms=None):
+        self.expires_at = None if budget_ms is None else time.monotonic() + budget_ms / 1000
+
+    def remaining(self):
+        """Seconds left, or None without a deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, default):
+        """The default timeout, shortened to the time left"""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to the host: halved on every 429
+    and recovered additively after each successful request
+    """
+
+    def __init__(self, rate=2.0, capacity=3, min_rate=0.2, recovery=0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent and return the seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self, retry_after=None):
+        """Slow down after the host answered 429"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        """Creep back towards the configured rate"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery)
+
+
+class HostRateLimiter:
+    """One adaptive token bucket per host, shared by concurrent searches"""
+
+    def __init__(self, rate=2.0, capacity=3):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+
+RATE_LIMITER = HostRateLimiter()
+
+
+class RetryBudget:
+    """Caps the retries and total backoff time spent by a single search"""
+
+    def __init__(self, max_retries=6, max_delay=15.0):
+        self.retries_left = max_retries
+        self.delay_left = max_delay
+        self.lock = threading.Lock()
+
+    def spend(self, delay):
+        """Reserve one retry sleeping `delay` seconds, or return False"""
+        with self.lock:
+            if self.retries_left <= 0 or delay > self.delay_left:
+                return False
+            self.retries_left -= 1
+            self.delay_left -= delay
+            return True
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker persisted to a JSON file, so that separate
+    plugin processes share it. After `failure_threshold` consecutive failed
+    fetches the circuit opens and fetches fail fast for `cooldown` seconds;
+    then a single probe (guarded by an exclusive lock file) is let through
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, path, failure_threshold=3, cooldown=300, probe_timeout=60):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, states):
+        try:
+            write_atomic(self.path, json.dumps(states).encode('utf-8'))
+        except OSError as e:
+            print(f"Error saving circuit breaker state: {str(e)}", file=sys.stderr)
+
+    def probe_path(self, host):
+        safe_host = re.sub(r'[^A-Za-z0-9.-]', '_', host)
+        return f"{self.path}.{safe_host}.probe"
+
+    def state(self, url):
+        """Return 'closed', 'open' or 'half_open' for the url's host"""
+        host = urllib.parse.urlsplit(url).netloc
+        entry = self.load().get(host)
+        if not entry or entry.get('failures', 0) < self.failure_threshold:
+            return 'closed'
+        if time.time() - entry.get('opened_at', 0) < self.cooldown:
+            return 'open'
+        return 'half_open'
+
+    def allow(self, url):
+        """Whether a request to url may be sent now"""
+        state = self.state(url)
+        if state == 'closed':
+            return True
+        if state == 'open':
+            return False
+
+        # Half-open: only the process that wins the probe lock may try
+        probe = self.probe_path(urllib.parse.urlsplit(url).netloc)
+        try:
+            if time.time() - os.path.getmtime(probe) > self.probe_timeout:
+                os.unlink(probe)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(probe, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def record_success(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            states = self.load()
+            if host in states:
+                del states[host]
+                self.save(states)
+        self.release_probe(host)
+
+    def record_failure(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            states = self.load()
+            entry = states.setdefault(host, {'failures': 0, 'opened_at': 0})
+            entry['failures'] += 1
+            if entry['failures'] >= self.failure_threshold:
+                entry['opened_at'] = time.time()
+            self.save(states)
+        self.release_probe(host)
+
+    def release_probe(self, host):
+        try:
+            os.unlink(self.probe_path(host))
+        except OSError:
+            pass
+
+
+class PageCache:
+    """
+    Gzip-compressed page bodies on disk keyed by URL. Used to serve stale
+    results while the site is unreachable. Bodies come back as UTF-8 bytes,
+    whether they were stored as bytes or str.
+    """
+
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.gz')
+
+    def get(self, url, max_age=None):
+        """Return the cached body, or None if missing or older than max_age seconds"""
+        path = self.path(url)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, 'rb') as f:
+                return gzip.decompress(f.read())
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def put(self, url, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        write_atomic(self.path(url), gzip.compress(body, 6))
+        self.prune()
+
+    def prune(self):
+        """Drop the oldest entries beyond max_entries"""
+        try:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                       if name.endswith('.gz')]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries) - self.max_entries]:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+class SharedPageCache:
+    """
+    PageCache backend shared by every plugin process on the host through one
+    memory-mapped file, so a page fetched by one process serves the others.
+
+    The file holds a fixed-size hash index of `slots` entries, grouped in
+    sets of `ways` by URL hash, each owning slot_size bytes of gzip data; a
+    full set evicts its least recently read entry. Readers take no lock:
+    every entry carries a sequence number that is odd while a writer is
+    busy with it plus a checksum, and a read that overlaps a write is
+    retried. Writers serialize on an O_EXCL lock file and simply skip
+    caching if it stays taken; a page too large for a slot is not cached.
+    """
+
+    magic = b'BSPAGES1'
+    # magic, slots, ways, slot_size
+    header = struct.Struct('<8sIII')
+    header_size = 64
+    # sequence, URL hash, stored at, read at, length, checksum
+    entry = struct.Struct('<Q20sddII')
+    entry_size = 64
+
+    def __init__(self, path, slots=512, ways=8, slot_size=64 * 1024, lock_timeout=1.0, stale_lock=10.0):
+        self.path = path
+        self.slots = slots - slots % ways
+        self.ways = ways
+        self.slot_size = slot_size
+        self.lock_timeout = lock_timeout
+        self.stale_lock = stale_lock
+        self.lock = threading.Lock()
+        self.data_offset = self.header_size + self.slots * self.entry_size
+        self.size = self.data_offset + self.slots * slot_size
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.mm = self.open()
+
+    def open(self):
+        expected = self.header.pack(self.magic, self.slots, self.ways, self.slot_size)
+        try:
+            with open(self.path, 'rb') as f:
+                valid = f.read(self.header.size) == expected and os.fstat(f.fileno()).st_size == self.size
+        except OSError:
+            valid = False
+        if not valid:
+            # Build a fresh (sparse) file aside and swap it in whole
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(expected)
+                    f.truncate(self.size)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        with open(self.path, 'r+b') as f:
+            return mmap.mmap(f.fileno(), self.size)
+
+    def candidates(self, key):
+        first = int.from_bytes(key[:8], 'little') % (self.slots // self.ways) * self.ways
+        return range(first, first + self.ways)
+
+    def read_entry(self, slot):
+        return self.entry.unpack_from(self.mm, self.header_size + slot * self.entry_size)
+
+    def get(self, url, max_age=None):
+        """Return the cached body, or None if missing or older than max_age seconds"""
+        key = hashlib.sha1(url.encode('utf-8')).digest()
+        for slot in self.candidates(key):
+            for _ in range(3):
+                sequence, entry_key, stored_at, _, length, checksum = self.read_entry(slot)
+                if sequence & 1:
+                    time.sleep(0.001)
+                    continue
+                if entry_key != key or length > self.slot_size:
+                    break
+                start = self.data_offset + slot * self.slot_size
+                data = self.mm[start:start + length]
+                if self.read_entry(slot)[0] != sequence or zlib.crc32(data) != checksum:
+                    continue
+                if max_age is not None and time.time() - stored_at > max_age:
+                    return None
+                # Racing another reader's timestamp is harmless
+                struct.pack_into('<d', self.mm, self.header_size + slot * self.entry_size + 36, time.time())
+                try:
+                    return gzip.decompress(data)
+                except (OSError, EOFError, ValueError):
+                    return None
+        return None
+
+    def put(self, url, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        data = gzip.compress(body, 6)
+        if len(data) > self.slot_size:
+            return
+        key = hashlib.sha1(url.encode('utf-8')).digest()
+        with self.lock:
+            if not self.acquire():
+                return
+            try:
+                slots = list(self.candidates(key))
+                entries = {slot: self.read_entry(slot) for slot in slots}
+                # Same URL first, then an empty slot, then the least recently read
+                slot = next((slot for slot in slots if entries[slot][1] == key), None)
+                if slot is None:
+                    slot = min(slots, key=lambda slot: (entries[slot][0] != 0, entries[slot][3]))
+                sequence = entries[slot][0] | 1
+                offset = self.header_size + slot * self.entry_size
+                struct.pack_into('<Q', self.mm, offset, sequence)
+                start = self.data_offset + slot * self.slot_size
+                self.mm[start:start + len(data)] = data
+                now = time.time()
+                self.entry.pack_into(self.mm, offset, sequence, key, now, now, len(data), zlib.crc32(data))
+                struct.pack_into('<Q', self.mm, offset, sequence + 1)
+            finally:
+                self.release()
+
+    def acquire(self):
+        """Take the cross-process writer lock, breaking it if a writer died holding it"""
+        lock_path = self.path + '.lock'
+        give_up = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                pass
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.stale_lock:
+                    os.unlink(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() >= give_up:
+                return False
+            time.sleep(0.005)
+
+    def release(self):
+        try:
+            os.unlink(self.path + '.lock')
+        except OSError:
+            pass
+
+    def prune(self):
+        """Eviction happens on put; kept for PageCache compatibility"""
+
+    def close(self):
+        self.mm.close()
+
+
+class LatencyTracker:
+    """
+    Sliding window and EWMA of recent successful fetch latencies per host,
+    persisted to path (if given) so timeouts adapt across plugin runs
+    """
+
+    # Timeouts derived by timeouts(): multiples of the observed latency,
+    # clamped to these bounds in seconds
+    connect_factor = 3
+    connect_floor = 1.0
+    connect_ceiling = 10.0
+    read_factor = 3
+    read_floor = 3.0
+    read_ceiling = DEFAULT_TIMEOUT
+
+    def __init__(self, window=200, path=None, alpha=0.2):
+        self.window = window
+        self.path = path
+        self.alpha = alpha
+        self.samples = {}
+        self.ewma = {}
+        self.lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                hosts = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for host, state in hosts.items():
+                self.samples[host] = collections.deque(state.get('samples', ()), maxlen=self.window)
+                if state.get('ewma') is not None:
+                    self.ewma[host] = state['ewma']
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            hosts = {host: {'ewma': self.ewma.get(host), 'samples': list(samples)}
+                     for host, samples in self.samples.items()}
+        try:
+            write_atomic(self.path, json.dumps(hosts).encode('utf-8'))
+        except OSError as e:
+            print(f"Error saving latency history: {str(e)}", file=sys.stderr)
+
+    def observe(self, url, seconds):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.samples:
+                self.samples[host] = collections.deque(maxlen=self.window)
+            self.samples[host].append(seconds)
+            previous = self.ewma.get(host)
+            self.ewma[host] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def percentile(self, url, q, min_samples=10):
+        """Return the q-th percentile latency, or None with too little history"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            samples = sorted(self.samples.get(host, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def timeouts(self, url):
+        """
+        (connect, read) timeouts for url: the EWMA bounds connecting and
+        the worse of the EWMA and the 99th percentile bounds each read, both
+        scaled by their factor and clamped. Hosts without enough history
+        get the ceilings.
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            typical = self.ewma.get(host)
+        tail = self.percentile(url, 99)
+        if typical is None or tail is None:
+            return self.connect_ceiling, self.read_ceiling
+        connect = min(self.connect_ceiling, max(self.connect_floor, typical * self.connect_factor))
+        read = min(self.read_ceiling, max(self.read_floor, max(typical, tail) * self.read_factor))
+        return connect, read
+
+
+LATENCY = LatencyTracker()
+
+
+def run_in_thread(fn, *args):
+    """
+    Run fn on a daemon thread and return a Future. Daemon threads let an
+    abandoned request die with the process instead of delaying its exit.
+    """
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+class PageFetcher:
+    """
+    Rate-limited page fetcher retrying 429, 5xx and network errors with
+    jittered exponential backoff that honours Retry-After.
+
+    With hedging enabled, a request still unanswered after the host's
+    `hedge_percentile` latency gets a duplicate, sent to the next mirror
+    if any are configured; the first answer wins and the other is abandoned.
+    Hedges are capped at `hedge_ratio` of requests plus `hedge_burst`.
+
+    With adaptive_timeouts, requests made without an explicit timeout get
+    connect and read timeouts derived from the host's latency history.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, transport=None, limiter=None, breaker=None, max_attempts=4,
+                 base_delay=0.5, max_delay=30.0, hedge=True, mirrors=(),
+                 hedge_percentile=95, hedge_delay=1.0, min_hedge_delay=0.05,
+                 hedge_ratio=0.1, hedge_burst=1, latency=None, adaptive_timeouts=True):
+        self.transport = transport
+        self.limiter = limiter or RATE_LIMITER
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.mirrors = list(mirrors)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.hedge_ratio = hedge_ratio
+        self.hedge_burst = hedge_burst
+        self.latency = latency or LATENCY
+        self.adaptive_timeouts = adaptive_timeouts
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential delay, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def fetch(self, url, budget=None, timeout=None, deadline=None):
+        """Return the page body for url, raising FetchError when retries run out"""
+        if self.breaker and not self.breaker.allow(url):
+            METRICS.inc('circuit_open_total')
+            raise CircuitOpenError(f"Circuit open for {urllib.parse.urlsplit(url).netloc}")
+
+        deadline = deadline or Deadline()
+        try:
+            body = self.fetch_with_retries(url, budget, timeout, deadline)
+        except FetchError as e:
+            # Only network errors, timeouts and 429/5xx say the host is unwell;
+            # a 404 or running out of search time says nothing about it
+            if self.breaker and self.host_failed(e) and not deadline.expired():
+                self.breaker.record_failure(url)
+            elif self.breaker:
+                self.breaker.release_probe(urllib.parse.urlsplit(url).netloc)
+            raise
+        except Exception:
+            if self.breaker:
+                self.breaker.release_probe(urllib.parse.urlsplit(url).netloc)
+            raise
+        if self.breaker:
+            self.breaker.record_success(url)
+        return body
+
+    def host_failed(self, error):
+        """Whether a FetchError should count against the host's circuit"""
+        return error.status is None or error.status in self.retry_statuses
+
+    def send(self, url, timeout=None, deadline=None):
+        """One rate-limited request, recording its latency"""
+        transport = self.transport or http_get_body
+        self.limiter.bucket(url).acquire()
+        if timeout is None and self.adaptive_timeouts:
+            timeout = self.latency.timeouts(url)
+        if deadline:
+            if isinstance(timeout, tuple):
+                timeout = tuple(deadline.timeout(part) for part in timeout)
+            else:
+                timeout = deadline.timeout(timeout or DEFAULT_TIMEOUT)
+            if min(timeout if isinstance(timeout, tuple) else (timeout,)) <= 0:
+                raise DeadlineExceeded(f"No time left to fetch {url}")
+        start = time.perf_counter()
+        body = transport(url, timeout)
+        elapsed = time.perf_counter() - start
+        METRICS.observe('fetch_seconds', elapsed)
+        self.latency.observe(url, elapsed)
+        return body
+
+    def hedge_after(self, url):
+        """Seconds to wait for url before sending a hedge"""
+        delay = self.latency.percentile(url, self.hedge_percentile)
+        if delay is None:
+            delay = self.hedge_delay
+        return max(self.min_hedge_delay, delay)
+
+    def hedge_url(self, url):
+        """Where to send the duplicate: the next mirror, or the same URL"""
+        if not self.mirrors:
+            return url
+        mirror = urllib.parse.urlsplit(self.mirrors[self.hedges % len(self.mirrors)])
+        return urllib.parse.urlsplit(url)._replace(scheme=mirror.scheme, netloc=mirror.netloc).geturl()
+
+    def claim_hedge(self):
+        with self.lock:
+            if self.hedges >= self.hedge_ratio * self.requests + self.hedge_burst:
+                return False
+            self.hedges += 1
+            return True
+
+    def attempt(self, url, timeout=None, deadline=None):
+        """Send url once, hedging it if it is slower than usual"""
+        with self.lock:
+            self.requests += 1
+        if not self.hedge:
+            return self.send(url, timeout, deadline)
+
+        primary = run_in_thread(self.send, url, timeout, deadline)
+        try:
+            return primary.result(timeout=self.hedge_after(url))
+        except concurrent.futures.TimeoutError:
+            pass
+        if not self.claim_hedge():
+            return primary.result()
+
+        METRICS.inc('hedges_fired_total')
+        hedge = run_in_thread(self.send, self.hedge_url(url), timeout, deadline)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        METRICS.inc('hedges_won_total')
+                        with self.lock:
+                            self.hedges_won += 1
+                    return future.result()
+
+        # Both failed: report the original request's error
+        return primary.result()
+
+    def fetch_with_retries(self, url, budget=None, timeout=None, deadline=None):
+        bucket = self.limiter.bucket(url)
+        budget = budget or RetryBudget()
+        deadline = deadline or Deadline()
+
+        for attempt in range(self.max_attempts):
+            status = retry_after = None
+            try:
+                body = self.attempt(url, timeout, deadline)
+                bucket.succeeded()
+                return body
+            except urllib.error.HTTPError as e:
+                status = e.code
+                retry_after = parse_retry_after(e.headers.get('Retry-After') if e.headers else None)
+                if status == 429:
+                    METRICS.inc('throttled_total')
+                    bucket.throttled(retry_after)
+                if status not in self.retry_statuses:
+                    raise FetchError(f"HTTP {status} for {url}", status=status)
+                error = e
+            except (urllib.error.URLError, OSError) as e:
+                error = e
+
+            if attempt + 1 >= self.max_attempts:
+                break
+            delay = self.backoff(attempt, retry_after)
+            remaining = deadline.remaining()
+            if (remaining is not None and delay >= remaining) or not budget.spend(delay):
+                break
+            METRICS.inc('retries_total')
+            time.sleep(delay)
+
+        raise FetchError(f"Giving up on {url}: {error}", status=status, retry_after=retry_after)
+
+
+class ResultParser:
+    """
+    Parser interface for engines: parse_html takes a page as the fetcher
+    returned it (raw bytes from the default HTTP transport, str from
+    transports such as helpers.retrieve_url) and appends plugin-format
+    result dicts to self.results
+    """
+
+    def __init__(self):
+        self.results = []
+        self.used_fallback = False
+
+    def parse_html(self, html_content):
+        raise NotImplementedError
+
+
+class ResultFilter:
+    """
+    Client-side result filter: at least min_seeds seeds, a size within
+    [min_size, max_size] bytes and none of the exclude keywords in the name
+    (case-insensitive). Unset bounds are not checked.
+    """
+
+    def __init__(self, min_seeds=None, min_size=None, max_size=None, exclude=()):
+        self.min_seeds = min_seeds
+        self.min_size = min_size
+        self.max_size = max_size
+        self.exclude = tuple(word.lower() for word in exclude if word)
+
+    def __bool__(self):
+        return (self.min_seeds is not None or self.min_size is not None
+                or self.max_size is not None or bool(self.exclude))
+
+    def accepts(self, name, seeds, size):
+        if self.min_seeds is not None and seeds < self.min_seeds:
+            return False
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.exclude:
+            name = name.lower()
+            return not any(word in name for word in self.exclude)
+        return True
+
+    def select(self, items, name, seeds, size):
+        """
+        Keep the items passing the filter, given functions reading an item's
+        name, seeds and size in bytes (-1 when unknown); names are only read
+        when there are keywords to exclude. Returns the kept items and
+        whether any item had fewer than min_seeds seeds.
+        """
+        kept = []
+        below_min_seeds = False
+        for item in items:
+            item_seeds = seeds(item)
+            if self.accepts(name(item) if self.exclude else '', item_seeds, size(item)):
+                kept.append(item)
+            elif self.min_seeds is not None and item_seeds < self.min_seeds:
+                below_min_seeds = True
+        METRICS.inc('filtered_total', len(items) - len(kept))
+        return kept, below_min_seeds
+
+
+# One parsed result page: its results, whether the filters dropped any
+# result for having fewer than min_seeds seeds, and the number of rows and
+# lowest seed count on the page as the site listed it, before filtering
+ResultPage = collections.namedtuple('ResultPage', ('results', 'below_min_seeds', 'rows', 'lowest_seeds'))
+
+
+class Engine:
+    """
+    Reusable search engine core: page URLs, fetching through a PageFetcher
+    with a page cache under the search deadline, parsing with a
+    ResultParser, filtering and deduplication. An engine sets url, name and
+    supported_categories and implements page_url and new_parser;
+    result_pages() then walks its pages and results() yields its
+    deduplicated results.
+    """
+
+    url = ''
+    name = ''
+    supported_categories = {'all': ''}
+    # Result pages read per search
+    pages = 3
+    # Seconds a cached page is served instead of refetching it (0 to disable)
+    cache_ttl = 300
+
+    def __init__(self, fetcher=None, cache=None):
+        self.fetcher = fetcher or PageFetcher()
+        self.cache = cache
+
+    def page_url(self, what, cat='all', page=1, sort=None):
+        """
+        URL of result page `page` for what in category cat, ordered by sort
+        ('seeders' or 'date') where the site supports it
+        """
+        raise NotImplementedError
+
+    def new_parser(self):
+        """A fresh ResultParser for one page"""
+        raise NotImplementedError
+
+    def fetch_page(self, url, budget=None, deadline=None, max_age=0):
+        """
+        Fetch a result page, reusing a cached copy younger than max_age
+        seconds and falling back to a stale one while the circuit is open
+        """
+        if self.cache and max_age:
+            html_content = self.cache.get(url, max_age=max_age)
+            if html_content is not None:
+                METRICS.inc('cache_hits_total')
+                return html_content
+
+        try:
+            html_content = self.fetcher.fetch(url, budget, deadline=deadline)
+        except CircuitOpenError:
+            html_content = self.cache.get(url) if self.cache else None
+            if html_content is None:
+                raise
+            METRICS.inc('cache_hits_total')
+            return html_content
+
+        if html_content:
+            METRICS.inc('pages_fetched_total')
+            if self.cache:
+                try:
+                    self.cache.put(url, html_content)
+                except OSError as e:
+                    # The page was fetched; only later searches miss the copy
+                    print(f"Error caching {url}: {str(e)}", file=sys.stderr)
+        return html_content
+
+    def parse_page(self, html_content, filters=None, limit=None):
+        """
+        Parse one fetched page into a ResultPage of complete results passing
+        filters. With limit, only that many best-seeded results are needed.
+        """
+        parser = self.new_parser()
+        parser.parse_html(html_content)
+        results = [result for result in parser.results if result.get('name') and result.get('link')]
+        rows, lowest_seeds = len(results), min(map(seeds_score, results), default=-1)
+        below_min_seeds = False
+        if filters:
+            results, below_min_seeds = filters.select(
+                results, lambda result: result['name'], lambda result: to_int(result.get('seeds')),
+                lambda result: to_int(result.get('size')))
+        if limit:
+            results = sorted(results, key=seeds_score, reverse=True)[:limit]
+        return ResultPage(results, below_min_seeds, rows, lowest_seeds)
+
+    def result_pages(self, what, cat='all', deadline=None, cached=True, sort=None, filters=None, limit=None):
+        """
+        Yield (page number, ResultPage) for each of the first self.pages
+        result pages, parsed by parse_page. A page still being fetched when the
+        deadline passes is abandoned; the walk stops then or when the
+        circuit opens, while other page errors are reported and the next
+        page is tried. Callers stop paginating early by breaking out.
+        """
+        budget = RetryBudget()
+        deadline = deadline or Deadline()
+        max_age = self.cache_ttl if cached else 0
+
+        for page in range(1, self.pages + 1):
+            try:
+                # Get page content, giving up on it when the deadline passes
+                future = run_in_thread(self.fetch_page, self.page_url(what, cat, page, sort),
+                                       budget, deadline, max_age)
+                try:
+                    html_content = future.result(timeout=deadline.remaining())
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    raise DeadlineExceeded(f"Search deadline reached while fetching page {page}")
+                if not html_content:
+                    continue
+                result_page = self.parse_page(html_content, filters, limit)
+
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                # The remaining pages would be rejected the same way
+                print(f"Stopping {self.name} search: {str(e)}", file=sys.stderr)
+                break
+
+            except Exception as e:
+                # Don't print to stdout, use stderr for errors
+                METRICS.inc('errors_total')
+                print(f"Error searching {self.name} page {page}: {str(e)}", file=sys.stderr)
+                continue
+
+            yield page, result_page
+
+    def results(self, what, cat='all', deadline=None, cached=True, filters=None):
+        """
+        Yield the engine's results for what passing filters, page by page,
+        skipping duplicates
+        """
+        seen = set()
+        for _, result_page in self.result_pages(what, cat, deadline, cached, filters=filters):
+            for result in result_page.results:
+                key = result_key(result)
+                if key in seen:
+                    METRICS.inc('duplicates_dropped_total')
+                    continue
+                seen.add(key)
+                result.setdefault('engine_url', self.url)
+                yield result
+
+
+def print_result(result):
+    """Default result sink: hand the result to qBittorrent"""
+    prettyPrinter(result)
+
+
+class bitsearch(Engine):
     """
     BitSearch.to search engine plugin for qBittorrent
     """
@@ -27,88 +1333,1324 @@ class bitsearch(object):
         'tv': 'tv'
     }
 
+    # Seconds to fail fast after repeated fetch failures
+    breaker_cooldown = 300
+    # Alternative base URLs that slow page fetches may be hedged to
+    mirrors = []
+    # Overall search budget in milliseconds (None for no limit)
+    deadline_ms = 30000
+    # Record every parsed result in the local full-text index
+    use_index = False
+    # Share the page cache with other plugin processes through a memory-mapped file
+    shared_cache = False
+    # Detail pages fetched at once when enriching results
+    enrich_concurrency = 4
+    # Detail pages hardly change, so cached copies are reused for a month
+    detail_cache_ttl = 30 * 24 * 3600
+
     def __init__(self):
-        pass
+        try:
+            directory = state_dir()
+            cache = (SharedPageCache(os.path.join(directory, 'pages.mmap')) if self.shared_cache
+                     else PageCache(os.path.join(directory, 'pages')))
+        except OSError as e:
+            # Search without the cache, breaker and latency history rather than not at all
+            print(f"Error opening state directory: {str(e)}", file=sys.stderr)
+            directory = cache = None
+        super().__init__(
+            PageFetcher(breaker=CircuitBreaker(os.path.join(directory, 'breaker.json'),
+                                               cooldown=self.breaker_cooldown) if directory else None,
+                        mirrors=self.mirrors,
+                        latency=LatencyTracker(path=os.path.join(directory, 'latency.json') if directory else None)),
+            cache)
+        if os.environ.get('BITSEARCH_FIXTURES'):
+            self.fetcher.transport = FixtureTransport(os.environ['BITSEARCH_FIXTURES'],
+                                                      os.environ.get('BITSEARCH_FIXTURE_MODE', 'replay'))
+        self.index = self.open_index() if self.use_index and directory else None
+        self.refresh_thread = None
+
+    def open_index(self):
+        return ResultIndex(os.path.join(state_dir(), 'index.sqlite3'))
 
     def download_torrent(self, info):
         """Download torrent file"""
+        # Magnet links need no download; qBittorrent takes them as they are
+        if info.startswith('magnet:'):
+            print(info + ' ' + info)
+            return
         print(download_file(info))
 
-    def search(self, what, cat='all'):
+    def download_torrents(self, infos, directory=None, concurrency=4):
+        """
+        Download many torrents at once. Magnet links are passed through
+        without any request; .torrent URLs are fetched concurrently through
+        a rate-limited fetcher, checked for a bencoded dictionary with an
+        info key, and written atomically to directory (a temporary directory
+        by default). Prints one "path url" line per success, as
+        download_torrent does, and returns a report per info with the path,
+        size, seconds taken and error if any.
+        """
+        directory = directory or tempfile.mkdtemp(prefix='bitsearch-')
+        os.makedirs(directory, exist_ok=True)
+        fetcher = PageFetcher(transport=lambda url, timeout: http_get_bytes(url, timeout)[0],
+                              limiter=self.fetcher.limiter, breaker=self.fetcher.breaker, hedge=False)
+
+        def download(info):
+            report = {'info': info, 'path': None, 'bytes': 0, 'seconds': 0.0, 'error': None}
+            if info.startswith('magnet:'):
+                report['path'] = info
+                return report
+            start = time.perf_counter()
+            try:
+                data = fetcher.fetch(info)
+                if not is_torrent_data(data):
+                    raise ValueError('response is not a bencoded torrent')
+                path = os.path.join(directory, hashlib.sha1(info.encode('utf-8')).hexdigest() + '.torrent')
+                write_atomic(path, data)
+                report['path'] = path
+                report['bytes'] = len(data)
+            except Exception as e:
+                METRICS.inc('errors_total')
+                report['error'] = str(e)
+                print(f"Error downloading {info}: {str(e)}", file=sys.stderr)
+            report['seconds'] = time.perf_counter() - start
+            return report
+
+        with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+            reports = list(executor.map(download, infos))
+
+        for report in reports:
+            if report['path']:
+                print(report['path'] + ' ' + report['info'])
+        return reports
+
+    def search(self, what, cat='all', deadline_ms=None, top_k=None, score=None,
+               from_index=False, refresh=False, new_only=False, cached=True, enrich=False,
+               sink=None, min_seeds=None, min_size=None, max_size=None, exclude=()):
         """
         Search for torrents on bitsearch.to
+
+        Results from the first `pages` result pages are emitted page by
+        page. Once deadline_ms (default: the deadline_ms attribute) runs
+        out, the page being fetched is abandoned and the search returns with
+        what has been emitted so far.
+
+        With top_k, results are requested sorted by seeders and only the
+        best top_k by score (default: seeds) are emitted at the end. With the
+        default score, pagination stops as soon as a page cannot beat the
+        current k-th result.
+
+        With from_index, the answer comes straight from the local index
+        (category is ignored there). With refresh as well, the live search
+        then runs on a background thread (self.refresh_thread) to update
+        the index, passing on only results the index did not return.
+
+        With new_only, results are requested newest first and only torrents
+        never returned before for this (what, cat) are emitted; pagination
+        stops at the first page that holds nothing new. It cannot be combined
+        with top_k: results ranked out of a top k would be skipped by the
+        next new_only search once a newer page is all known.
+
+        Pages fetched within cache_ttl seconds are reused unless cached is
+        False; new_only searches always go to the site.
+
+        With enrich, results lacking a size or date are completed from their
+        detail pages concurrently and emitted once done; whatever is still
+        incomplete when the deadline passes is emitted as it is.
+
+        min_seeds, min_size/max_size (bytes) and exclude (keywords that must
+        not appear in the name) filter the parsed rows before any result is
+        built. With min_seeds, results are requested sorted by
+        seeders (unless new_only) so pagination stops at the first page
+        holding a result below it.
+
+        Results go to sink, prettyPrinter by default.
         """
+        sink = sink or print_result
+        filters = ResultFilter(min_seeds, min_size, max_size, exclude)
+
+        if from_index:
+            if self.index is None:
+                self.index = self.open_index()
+            hits = self.index.search(what, limit=top_k or 100)
+            if filters:
+                hits = [result for result in hits
+                        if filters.accepts(result['name'], to_int(result['seeds']), to_int(result['size']))]
+            METRICS.inc('searches_total')
+            if hits:
+                METRICS.inc('cache_hits_total')
+            for result in hits:
+                sink(result)
+                METRICS.inc('results_emitted_total')
+
+            if refresh:
+                known = {result_key(result) for result in hits}
+
+                def forward_new(result):
+                    if result_key(result) not in known:
+                        sink(result)
+
+                self.refresh_thread = threading.Thread(
+                    target=self.search, args=(what, cat),
+                    kwargs={'deadline_ms': deadline_ms, 'cached': False, 'sink': forward_new})
+                self.refresh_thread.start()
+            return
+
+        if new_only and top_k:
+            raise ValueError('new_only cannot be combined with top_k')
+        top = TopK(top_k, score) if top_k else None
+        seeders_sorted = bool(top) or (min_seeds is not None and not new_only)
+        sort = 'seeders' if seeders_sorted else 'date' if new_only else None
+        known = SeenSet.for_query(what, cat) if new_only else None
+
+        METRICS.inc('searches_total')
+        deadline = Deadline(self.deadline_ms if deadline_ms is None else deadline_ms)
+        # Top-K ranks each torrent once; plain searches pass pages on as they are
+        seen = set() if top else None
+        if enrich:
+            sink = DetailEnricher(self, sink, deadline, self.enrich_concurrency)
+
+        # With the default score only a page's k best-seeded results can make the top k
+        limit = top_k if top and score is None else None
+        for _, result_page in self.result_pages(what, cat, deadline, cached and not new_only, sort,
+                                                filters, limit):
+            if self.index is not None:
+                self.index.add(result_page.results)
+
+            # A page whose rows were all filtered out says nothing about older pages
+            page_known = bool(result_page.results) or not result_page.rows
+            for result in result_page.results:
+                if seen is not None or known is not None:
+                    key = result_key(result)
+                    if (seen is not None and key in seen) or (known is not None and key in known):
+                        METRICS.inc('duplicates_dropped_total')
+                        continue
+                    if seen is not None:
+                        seen.add(key)
+                page_known = False
+                if top:
+                    top.push(result)
+                    continue
+                if known is not None:
+                    known.add(key)
+                sink(result)
+                METRICS.inc('results_emitted_total')
+
+            # Seeder-sorted pages only get worse from here on, judged by the page
+            # as listed so that rows dropped by the filters do not end the walk
+            if top and score is None and (not result_page.rows or top.cannot_improve(result_page.lowest_seeds)):
+                break
+            # Older pages of a date-sorted listing were seen on earlier runs
+            if known is not None and page_known:
+                break
+            # Later pages of a seeder-sorted listing are all below min_seeds
+            if seeders_sorted and result_page.below_min_seeds:
+                break
+
+        if known is not None:
+            known.save()
+        self.fetcher.latency.save()
+
+        if top:
+            for result in top.results():
+                sink(result)
+                METRICS.inc('results_emitted_total')
+
+        if enrich:
+            sink.close()
+
+    def search_url(self, what, cat='all'):
+        """URL of the first result page for what in category cat"""
         # URL encode the search query
         query = urllib.parse.quote_plus(what)
 
         # Build search URL
         if cat == 'all':
-            search_url = f"{self.url}/search?q={query}"
-        else:
-            category = self.supported_categories.get(cat, '')
-            if category:
-                search_url = f"{self.url}/search?q={query}&category={category}"
-            else:
-                search_url = f"{self.url}/search?q={query}"
+            return f"{self.url}/search?q={query}"
+        category = self.supported_categories.get(cat, '')
+        if category:
+            return f"{self.url}/search?q={query}&category={category}"
+        return f"{self.url}/search?q={query}"
+
+    def page_url(self, what, cat='all', page=1, sort=None):
+        page_url = self.search_url(what, cat)
+        if sort:
+            page_url += f"&sort={sort}"
+        return f"{page_url}&page={page}" if page > 1 else page_url
+
+    def new_parser(self):
+        return BitSearchParser()
+
+    def parse_page(self, html_content, filters=None, limit=None):
+        """
+        Parse a page into a columnar ResultBatch, filter it and keep the
+        limit best-seeded rows there, and build dicts only for what is left
+        """
+        batch = self.new_parser().parse_batch(html_content)
+        rows, lowest_seeds = len(batch), min(batch.seeds, default=-1)
+        if filters:
+            batch.filter(filters)
+        if limit:
+            batch.sort_by_seeds().limit(limit)
+        return ResultPage(batch.results(), batch.below_min_seeds, rows, lowest_seeds)
+
+
+class DetailEnricher:
+    """
+    Sink wrapper that completes results missing a size or date from their
+    detail pages. Complete results pass straight through; incomplete ones
+    are queued for up to `concurrency` worker threads and emitted when done.
+    close() waits for the rest until the deadline, then emits them unenriched.
+    """
+
+    def __init__(self, plugin, sink, deadline, concurrency=4):
+        self.plugin = plugin
+        self.sink = sink
+        self.deadline = deadline
+        self.concurrency = concurrency
+        self.queue = queue.Queue()
+        self.workers = []
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, result):
+        if result.get('size', '-1') != '-1' and result.get('pub_date', '-1') != '-1' \
+                or not result.get('desc_link'):
+            self.emit(result)
+            return
+        with self.lock:
+            self.pending[id(result)] = result
+        self.queue.put(result)
+        # Workers start as work arrives, so complete searches start none
+        if len(self.workers) < self.concurrency:
+            worker = threading.Thread(target=self.work, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def emit(self, result):
+        with self.lock:
+            self.sink(result)
+
+    def work(self):
+        while True:
+            result = self.queue.get()
+            if result is None:
+                return
+            self.enrich(result)
+
+    def enrich(self, result):
+        if id(result) not in self.pending:
+            return
+        try:
+            html_content = self.plugin.fetch_page(
+                result['desc_link'], deadline=self.deadline, max_age=self.plugin.detail_cache_ttl)
+            details = BitSearchParser().parse_details(html_content or '')
+        except Exception as e:
+            print(f"Error enriching {result['desc_link']}: {str(e)}", file=sys.stderr)
+            details = {}
+        with self.lock:
+            if self.pending.pop(id(result), None) is None:
+                return
+            for field, value in details.items():
+                if result.get(field, '-1') == '-1':
+                    result[field] = value
+            self.sink(result)
+
+    def close(self):
+        """Wait for enrichment until the deadline, then flush what is left"""
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=self.deadline.remaining())
+        with self.lock:
+            leftovers = list(self.pending.values())
+            self.pending.clear()
+            for result in leftovers:
+                self.sink(result)
+
+
+def is_torrent_data(data):
+    """Cheap bencode sanity check: a dictionary holding an info dictionary"""
+    return (data[:1] == b'd' and data[-1:] == b'e'
+            and b'4:infod' in data and re.match(rb'd\d+:', data) is not None)
+
+
+def seeds_score(result):
+    """Default top-k score: the seed count, -1 when unknown"""
+    try:
+        return int(result.get('seeds', -1))
+    except (TypeError, ValueError):
+        return -1
+
+
+class TopK:
+    """Bounded min-heap keeping the k highest-scoring results"""
+
+    def __init__(self, k, score=None):
+        self.k = k
+        self.score = score or seeds_score
+        self.heap = []
+        self.counter = 0
 
-        # Search multiple pages for better results
-        for page in range(1, 4):  # Search first 3 pages
-            if page > 1:
-                page_url = f"{search_url}&page={page}"
+    def push(self, result):
+        # The counter keeps ties in arrival order and avoids comparing dicts
+        entry = (self.score(result), -self.counter, result)
+        self.counter += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[0] > self.heap[0][0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def cannot_improve(self, lowest_score):
+        """Whether a page sorted by score, down to lowest_score, leaves nothing better to find"""
+        return len(self.heap) >= self.k and lowest_score <= self.heap[0][0]
+
+    def results(self):
+        """The kept results, best first"""
+        return [result for _, _, result in sorted(self.heap, reverse=True)]
+
+
+def result_key(result):
+    """Identify a result by infohash, falling back to its links"""
+    match = re.search(r'btih:([0-9a-zA-Z]+)', result.get('link', ''))
+    if match:
+        return match.group(1).upper()
+    return result.get('link') or result.get('desc_link')
+
+
+class SeenSet:
+    """
+    Exact on-disk set of infohashes, stored as sorted 20-byte records and
+    probed with binary search. Keys that are not hex infohashes are
+    stored by their SHA-1.
+    """
+
+    record_size = 20
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'rb') as f:
+                self.data = f.read()
+        except OSError:
+            self.data = b''
+        self.data = self.data[:len(self.data) - len(self.data) % self.record_size]
+        self.pending = set()
+
+    @classmethod
+    def for_query(cls, what, cat='all'):
+        directory = os.path.join(state_dir(), 'seen')
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha1(f"{cat}\0{what.strip().lower()}".encode('utf-8')).hexdigest()
+        return cls(os.path.join(directory, name + '.seen'))
+
+    def record(self, key):
+        if re.fullmatch(r'[0-9A-Fa-f]{40}', key):
+            return bytes.fromhex(key)
+        return hashlib.sha1(key.encode('utf-8')).digest()
+
+    def __len__(self):
+        return len(self.data) // self.record_size + len(self.pending)
+
+    def __contains__(self, key):
+        record = self.record(key)
+        if record in self.pending:
+            return True
+        size = self.record_size
+        low, high = 0, len(self.data) // size
+        while low < high:
+            middle = (low + high) // 2
+            probe = self.data[middle * size:(middle + 1) * size]
+            if probe < record:
+                low = middle + 1
+            elif probe > record:
+                high = middle
             else:
-                page_url = search_url
+                return True
+        return False
 
-            try:
-                # Get page content
-                html_content = retrieve_url(page_url)
-                if not html_content:
+    def add(self, key):
+        if key not in self:
+            self.pending.add(self.record(key))
+
+    def save(self):
+        """Merge pending keys into the sorted file"""
+        if not self.pending:
+            return
+        size = self.record_size
+        records = [self.data[i:i + size] for i in range(0, len(self.data), size)]
+        self.data = b''.join(sorted(records + list(self.pending)))
+        self.pending = set()
+        write_atomic(self.path, self.data)
+
+
+def to_int(value, default=-1):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class ResultIndex:
+    """
+    SQLite index of every result seen, keyed by infohash and searchable by
+    name through FTS5 (or LIKE when the sqlite build lacks FTS5). Seeds,
+    leechers and size are updated to the latest values on every sighting.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        connection = self.connection()
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                infohash TEXT NOT NULL UNIQUE,
+                link TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                seeds INTEGER NOT NULL,
+                leech INTEGER NOT NULL,
+                engine_url TEXT NOT NULL,
+                desc_link TEXT NOT NULL,
+                pub_date INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        ''')
+        try:
+            connection.executescript('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS results_fts
+                    USING fts5(name, content='results', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+                    INSERT INTO results_fts(rowid, name) VALUES (new.id, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+                    INSERT INTO results_fts(results_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                END;
+            ''')
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def connection(self):
+        """One connection per thread, as sqlite3 connections cannot be shared"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def add(self, results):
+        """Insert or refresh results; returns how many were written"""
+        now = time.time()
+        rows = [
+            (result_key(r), r['link'], r['name'].strip(), to_int(r.get('size')), to_int(r.get('seeds')),
+             to_int(r.get('leech')), r.get('engine_url', ''), r.get('desc_link', ''),
+             to_int(r.get('pub_date')), now)
+            for r in results if r.get('name') and r.get('link')
+        ]
+        with self.connection() as connection:
+            connection.executemany('''
+                INSERT INTO results (infohash, link, name, size, seeds, leech, engine_url,
+                                     desc_link, pub_date, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(infohash) DO UPDATE SET
+                    link = excluded.link,
+                    seeds = excluded.seeds,
+                    leech = excluded.leech,
+                    size = CASE WHEN excluded.size > 0 THEN excluded.size ELSE size END,
+                    pub_date = CASE WHEN excluded.pub_date > 0 THEN excluded.pub_date ELSE pub_date END,
+                    updated_at = excluded.updated_at
+            ''', rows)
+        return len(rows)
+
+    def import_jsonl(self, path, batch_size=10000):
+        """Bulk-load a JSONL dump of result dicts (optionally gzipped)"""
+        opener = gzip.open if path.endswith('.gz') else open
+        total = 0
+        batch = []
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
                     continue
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    total += self.add(batch)
+                    batch = []
+        if batch:
+            total += self.add(batch)
+        return total
 
-                # Parse the HTML content
-                parser = BitSearchParser()
-                parser.parse_html(html_content)
+    def search(self, what, limit=100):
+        """Results whose name contains every word of what, most seeded first"""
+        words = re.findall(r'\w+', what)
+        if not words:
+            return []
 
-                # Process results
-                for result in parser.results:
-                    # Validate result has required fields
-                    if result.get('name') and result.get('link'):
-                        prettyPrinter(result)
+        select = 'SELECT r.link, r.name, r.size, r.seeds, r.leech, r.engine_url, r.desc_link, r.pub_date'
+        if self.fts:
+            query = ' '.join('"%s"*' % word for word in words)
+            rows = self.connection().execute(
+                f"{select} FROM results_fts JOIN results r ON r.id = results_fts.rowid "
+                "WHERE results_fts MATCH ? ORDER BY r.seeds DESC LIMIT ?", (query, limit))
+        else:
+            conditions = ' AND '.join('r.name LIKE ?' for _ in words)
+            rows = self.connection().execute(
+                f"{select} FROM results r WHERE {conditions} ORDER BY r.seeds DESC LIMIT ?",
+                [f"%{word}%" for word in words] + [limit])
 
-            except Exception as e:
-                # Don't print to stdout, use stderr for errors
-                import sys
-                print(f"Error searching page {page}: {str(e)}", file=sys.stderr)
-                continue
+        return [self.to_result(row) for row in rows]
+
+    @staticmethod
+    def to_result(row):
+        """Turn a row back into the string-valued dict prettyPrinter expects"""
+        link, name, size, seeds, leech, engine_url, desc_link, pub_date = row
+        return {
+            'link': link,
+            'name': name,
+            'size': str(size),
+            'seeds': str(seeds),
+            'leech': str(leech),
+            'engine_url': engine_url,
+            'desc_link': desc_link,
+            'pub_date': str(pub_date)
+        }
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+WatchEntry = collections.namedtuple('WatchEntry', 'query category interval prewarm',
+                                    defaults=('all', 900, False))
+
+
+class JsonlSink:
+    """Thread-safe sink appending results as JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, result):
+        line = json.dumps(result, ensure_ascii=False) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class WatchlistPoller:
+    """
+    Runs saved (query, category) searches on their intervals, spread by
+    random jitter, and sends results not seen before to sink. Entries
+    marked prewarm also refresh the plain search pages in the page cache so
+    interactive searches for them are served warm; they are polled at least
+    every half cache_ttl so the pages never expire in between. At most
+    max_concurrency searches run at once; request rates are bounded by the
+    process-wide per-host RATE_LIMITER.
+    """
+
+    def __init__(self, entries, sink, max_concurrency=2, jitter=0.1, plugin_factory=None):
+        self.entries = [WatchEntry(*entry) if not isinstance(entry, dict) else WatchEntry(**entry)
+                        for entry in entries]
+        self.sink = sink
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.plugin_factory = plugin_factory or bitsearch
+        # Factories other than engine classes get the default page cache lifetime
+        self.cache_ttl = getattr(self.plugin_factory, 'cache_ttl', Engine.cache_ttl)
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_file(cls, path, sink, **kwargs):
+        """Load entries from a JSON list of {query, category, interval, prewarm}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), sink, **kwargs)
+
+    def interval(self, entry):
+        """Seconds between polls of entry"""
+        if entry.prewarm:
+            return min(entry.interval, self.cache_ttl / 2)
+        return entry.interval
+
+    def next_run(self, entry, now):
+        return now + self.interval(entry) * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def poll(self, entry):
+        """Run one watchlist entry"""
+        try:
+            plugin = self.plugin_factory()
+            plugin.search(entry.query, entry.category, new_only=True, sink=self.sink)
+            if entry.prewarm:
+                plugin.search(entry.query, entry.category, cached=False, sink=lambda result: None)
+        except Exception as e:
+            METRICS.inc('errors_total')
+            print(f"Error polling '{entry.query}': {str(e)}", file=sys.stderr)
+
+    def run_once(self):
+        """Poll every entry once, concurrently"""
+        with concurrent.futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+            list(executor.map(self.poll, self.entries))
+
+    def run(self):
+        """Poll until stop() is called"""
+        now = time.monotonic()
+        # Start each entry at a random point of its first jitter window
+        schedule = [(now + random.uniform(0, self.interval(entry) * self.jitter), i)
+                    for i, entry in enumerate(self.entries)]
+        heapq.heapify(schedule)
+        running = set()
+
+        with concurrent.futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+            while schedule and not self.stop_event.is_set():
+                due, i = schedule[0]
+                if self.stop_event.wait(max(0.0, due - time.monotonic())):
+                    break
+                heapq.heappop(schedule)
+                # Skip a round rather than queue a second poll of the same entry
+                if i not in running:
+                    running.add(i)
+                    future = executor.submit(self.poll, self.entries[i])
+                    future.add_done_callback(lambda _, i=i: running.discard(i))
+                heapq.heappush(schedule, (self.next_run(self.entries[i], time.monotonic()), i))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+RESULT_FIELDS = ('link', 'name', 'size', 'seeds', 'leech', 'engine_url', 'desc_link', 'pub_date')
+
+
+def parse_records(html_content):
+    """
+    Parse a page into compact, cheaply pickled records: one tuple per result
+    in RESULT_FIELDS order. Returns (records, parse_seconds, used_fallback)
+    so a parent process can account for work done in a pool worker.
+    """
+    start = time.perf_counter()
+    parser = BitSearchParser()
+    parser.parse_html(html_content)
+    records = [tuple(result[field] for field in RESULT_FIELDS) for result in parser.results]
+    return records, time.perf_counter() - start, parser.used_fallback
+
+
+def record_to_result(record):
+    return dict(zip(RESULT_FIELDS, record))
+
+
+class ResultRecord(collections.namedtuple('ResultRecord', RESULT_FIELDS)):
+    """Engine-neutral result in RESULT_FIELDS order, keyed by infohash"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(*(str(result.get(field, '' if field in ('link', 'name') else -1)) for field in RESULT_FIELDS))
+
+    @property
+    def key(self):
+        return result_key(self._asdict())
+
+    def as_result(self):
+        return dict(zip(RESULT_FIELDS, self))
+
+
+class ResultMerger:
+    """
+    Deduplication layer across engines: keeps one record per infohash, the
+    copy with the most seeds, and hands them back ranked by seeds
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def add(self, result):
+        """Merge one result; returns False if it was a duplicate"""
+        record = ResultRecord.from_result(result)
+        key = record.key
+        with self.lock:
+            current = self.records.get(key)
+            if current is None or to_int(record.seeds) > to_int(current.seeds):
+                self.records[key] = record
+        if current is not None:
+            METRICS.inc('duplicates_dropped_total')
+        return current is None
+
+    def ranked(self):
+        with self.lock:
+            records = list(self.records.values())
+        records.sort(key=lambda record: to_int(record.seeds), reverse=True)
+        return records
+
+
+class MultiSearch:
+    """
+    Runs one search on several engines concurrently and emits their results
+    as a single stream, deduplicated by infohash and ranked by seeds. Every
+    engine walks its pages through the Engine core, so the deadline and
+    filters apply to each of them.
+    """
+
+    def __init__(self, engines, max_concurrency=None, deadline_ms=30000):
+        self.engines = list(engines)
+        self.max_concurrency = max_concurrency or len(self.engines) or 1
+        self.deadline_ms = deadline_ms
+
+    def search(self, what, cat='all', sink=None, cached=True, top_k=None, new_only=False,
+               min_seeds=None, min_size=None, max_size=None, exclude=()):
+        """
+        Search every engine supporting cat and return the number of results
+        emitted. top_k keeps only the best-seeded results; new_only, the
+        filters and cached work as in bitsearch.search.
+        """
+        sink = sink or print_result
+        filters = ResultFilter(min_seeds, min_size, max_size, exclude)
+        known = SeenSet.for_query(what, cat) if new_only else None
+        deadline = Deadline(self.deadline_ms)
+        merger = ResultMerger()
+        METRICS.inc('searches_total')
+
+        def collect(engine):
+            for result in engine.results(what, cat, deadline, cached and not new_only, filters):
+                merger.add(result)
+
+        engines = [engine for engine in self.engines if cat in engine.supported_categories]
+        with concurrent.futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+            futures = {executor.submit(collect, engine): engine for engine in engines}
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is not None:
+                    METRICS.inc('errors_total')
+                    print(f"Error searching {futures[future].name}: {future.exception()}", file=sys.stderr)
+
+        records = merger.ranked()
+        if known is not None:
+            records = [record for record in records if record.key not in known]
+        if top_k:
+            records = records[:top_k]
+        if known is not None:
+            for record in records:
+                known.add(record.key)
+            known.save()
+        for record in records:
+            sink(record.as_result())
+            METRICS.inc('results_emitted_total')
+        return len(records)
+
+
+class ResultBatch:
+    """
+    Columnar results collected by BitSearchParser.parse_batch: counts and
+    sizes sit in typed arrays, text fields stay as spans into the raw page
+    buffers. filter() and sort_by_seeds() work on those columns in bulk and
+    results() decodes and builds dicts only for the rows that survived.
+    """
+
+    UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+    SPAN_FIELDS = ('name', 'desc', 'link', 'date')
+
+    def __init__(self, encoding='utf-8'):
+        self.encoding = encoding
+        self.pages = []
+        self.page = array.array('q')
+        self.spans = {field: (array.array('q'), array.array('q')) for field in self.SPAN_FIELDS}
+        self.size_value = array.array('d')
+        self.size_unit = array.array('b')
+        self.seeds = array.array('q')
+        self.leech = array.array('q')
+        self.rows = array.array('q')
+        self.size_bytes = None
+        # Whether filter() dropped a row for having too few seeds
+        self.below_min_seeds = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_page(self, data):
+        self.pages.append(data)
+        return len(self.pages) - 1
+
+    def append(self, page, name, desc, link, date, size_value=-1.0, size_unit=-1, seeds=-1, leech=-1):
+        """Add one row; name, desc, link and date are (start, end) spans, (-1, -1) when missing"""
+        self.rows.append(len(self.page))
+        self.page.append(page)
+        for field, (start, end) in zip(self.SPAN_FIELDS, (name, desc, link, date)):
+            self.spans[field][0].append(start)
+            self.spans[field][1].append(end)
+        self.size_value.append(size_value)
+        self.size_unit.append(size_unit)
+        self.seeds.append(seeds)
+        self.leech.append(leech)
+        self.size_bytes = None
+
+    def append_result(self, result):
+        """Add a ready-made result dict, e.g. from the fallback parser"""
+        desc = result['desc_link']
+        if desc.startswith('https://bitsearch.to'):
+            desc = desc[len('https://bitsearch.to'):]
+        fields = [result['name'], desc, result['link']]
+        data = '\0'.join(fields).encode(self.encoding)
+        page = self.add_page(data)
+        spans, start = [], 0
+        for field in fields:
+            end = start + len(field.encode(self.encoding))
+            spans.append((start, end))
+            start = end + 1
+        size = to_int(result.get('size'))
+        self.append(page, *spans, (-1, -1), float(size), 0 if size > 0 else -1,
+                    to_int(result.get('seeds')), to_int(result.get('leech')))
+
+    def sizes(self):
+        """Sizes in bytes for every row (-1 when unknown), converted in one pass"""
+        if self.size_bytes is None:
+            multipliers = [1024 ** power for power in range(len(self.UNITS))]
+            self.size_bytes = array.array('q', [
+                int(value * multipliers[unit]) if unit >= 0 and value * multipliers[unit] >= 1 else -1
+                for value, unit in zip(self.size_value, self.size_unit)])
+        return self.size_bytes
+
+    def filter(self, filters):
+        """Keep the rows passing filters (a ResultFilter), reading names only to exclude keywords"""
+        rows, below_min_seeds = filters.select(
+            self.rows, lambda row: self.text('name', row), self.seeds.__getitem__, self.sizes().__getitem__)
+        self.rows = array.array('q', rows)
+        self.below_min_seeds = self.below_min_seeds or below_min_seeds
+        return self
+
+    def sort_by_seeds(self, reverse=True):
+        """Order the surviving rows by seeds, best first by default; ties keep page order"""
+        self.rows = array.array('q', sorted(self.rows, key=self.seeds.__getitem__, reverse=reverse))
+        return self
+
+    def limit(self, count):
+        """Keep only the first count surviving rows"""
+        del self.rows[count:]
+        return self
+
+    def text(self, field, row):
+        start, end = self.spans[field][0][row], self.spans[field][1][row]
+        if start < 0:
+            return ''
+        value = bytes(self.pages[self.page[row]][start:end]).decode(self.encoding, 'replace')
+        return html.unescape(value) if '&' in value else value
+
+    def results(self):
+        """Materialize the surviving rows as plugin-format dicts, in row order"""
+        sizes = self.sizes()
+        parser = BitSearchParser()
+        results = []
+        for row in self.rows:
+            date = self.text('date', row)
+            timestamp = parser.parse_date(date) if date else -1
+            size = sizes[row]
+            desc = self.text('desc', row)
+            results.append({
+                'link': self.text('link', row),
+                'name': self.text('name', row).replace('\n', ' ').replace('\r', ' ').strip(),
+                'size': str(size) if size > 0 else '-1',
+                'seeds': str(self.seeds[row]),
+                'leech': str(self.leech[row]),
+                'engine_url': 'https://bitsearch.to',
+                'desc_link': 'https://bitsearch.to' + desc if desc else '',
+                'pub_date': str(timestamp) if timestamp > 0 else '-1'
+            })
+        return results
+
+
+class ParsePool:
+    """
+    Parses pages in worker processes so the regex work of bulk modes is not
+    serialised by the GIL, while fetching stays on threads. With workers=0
+    pages are parsed inline.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.executor = (concurrent.futures.ProcessPoolExecutor(self.workers)
+                         if self.workers > 0 else None)
+        if self.executor is not None:
+            # Fork every worker now, before the caller starts the fetch threads:
+            # a child forked later could inherit METRICS or rate limiter locks
+            # held by one of them and deadlock on its first use
+            self.executor.submit(int).result()
+
+    def parse(self, html_content):
+        """Parse one page and return its result dicts"""
+        if self.executor is None:
+            records, seconds, used_fallback = parse_records(html_content)
+        else:
+            records, seconds, used_fallback = self.executor.submit(parse_records, html_content).result()
+            # Worker processes have their own METRICS, so account here
+            METRICS.observe('parse_seconds', seconds)
+            if used_fallback:
+                METRICS.inc('fallback_parser_total')
+        return [record_to_result(record) for record in records]
+
+    def map(self, pages, chunksize=4):
+        """Parse many pages, yielding each page's records in order"""
+        if self.executor is None:
+            for html_content in pages:
+                yield parse_records(html_content)[0]
+            return
+        for records, _, _ in self.executor.map(parse_records, pages, chunksize=chunksize):
+            yield records
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class ResultWriter:
+    """
+    Streams results to JSONL or CSV, gzip-compressed when the path ends in
+    .gz. Appends, so a resumed crawl continues the same file. Compressed
+    output gets one complete gzip member per write (read back as one
+    stream), and a member left unfinished by a killed run is cut off when
+    the file is reopened, so earlier batches stay readable.
+    """
+
+    fields = ('link', 'name', 'size', 'seeds', 'leech', 'engine_url', 'desc_link', 'pub_date',
+              'query', 'category')
+    # Bytes read at a time when checking members of a resumed file
+    chunk_size = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.csv = path.endswith('.csv') or path.endswith('.csv.gz')
+        self.compress = path.endswith('.gz')
+        if self.compress:
+            self.truncate_partial_member(path)
+        self.write_header = self.csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self.file = open(path, 'ab')
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def truncate_partial_member(path):
+        """Cut a gzip file back to the end of its last complete member"""
+        # Members are decompressed chunk by chunk, tracking the file offset
+        # where the last one ended, so resuming never holds the whole file
+        end = 0
+        member = zlib.decompressobj(wbits=31)
+        pending = b''
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    if not pending:
+                        pending = f.read(ResultWriter.chunk_size)
+                        if not pending:
+                            break
+                    try:
+                        member.decompress(pending)
+                    except zlib.error:
+                        break
+                    if member.eof:
+                        pending = member.unused_data
+                        end = f.tell() - len(pending)
+                        member = zlib.decompressobj(wbits=31)
+                    else:
+                        pending = b''
+                size = os.fstat(f.fileno()).st_size
+        except OSError:
+            return
+        if end < size:
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+
+    def write(self, results):
+        buffer = io.StringIO(newline='')
+        if self.csv:
+            writer = csv.DictWriter(buffer, self.fields, extrasaction='ignore')
+        with self.lock:
+            if self.write_header:
+                writer.writeheader()
+                self.write_header = False
+            for result in results:
+                if self.csv:
+                    writer.writerow(result)
+                else:
+                    buffer.write(json.dumps(result, ensure_ascii=False) + '\n')
+            data = buffer.getvalue().encode('utf-8')
+            if not data:
+                return
+            self.file.write(gzip.compress(data) if self.compress else data)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class Crawler:
+    """
+    Walks every result page of each (query, category) pair with at most
+    max_concurrency pairs in flight, streaming results to a ResultWriter.
+    Progress is checkpointed after every page, so an interrupted crawl
+    resumes where it stopped instead of refetching. A page written just
+    before an interruption may be written again on resume.
+    """
+
+    def __init__(self, queries, out_path, categories=('all',), checkpoint_path=None,
+                 max_pages=50, max_concurrency=4, parse_workers=0, plugin=None):
+        self.queries = list(queries)
+        self.categories = list(categories)
+        self.out_path = out_path
+        self.checkpoint_path = checkpoint_path or out_path + '.checkpoint.json'
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        self.parse_workers = parse_workers
+        self.plugin = plugin or bitsearch()
+        self.written = 0
+        self.lock = threading.Lock()
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.progress = json.load(f)
+        except (OSError, ValueError):
+            self.progress = {}
+
+    @staticmethod
+    def job_key(query, cat):
+        return f"{cat}\t{query}"
+
+    def checkpoint(self, key, page, written=0, done=False):
+        with self.lock:
+            self.written += written
+            self.progress[key] = {'page': page, 'done': done}
+            write_atomic(self.checkpoint_path, json.dumps(self.progress).encode('utf-8'))
+
+    def crawl_one(self, query, cat, writer, pool):
+        """Walk the pages of one pair, starting after the last checkpointed page"""
+        key = self.job_key(query, cat)
+        state = self.progress.get(key, {'page': 0, 'done': False})
+        if state['done']:
+            return
+
+        budget = RetryBudget()
+        page = state['page']
+        while page < self.max_pages:
+            page += 1
+            html_content = self.plugin.fetch_page(self.plugin.page_url(query, cat, page), budget)
+            results = pool.parse(html_content) if html_content else []
+            if not results:
+                break
+
+            if self.plugin.index is not None:
+                self.plugin.index.add(results)
+            writer.write(dict(result, query=query, category=cat) for result in results)
+            self.checkpoint(key, page, written=len(results))
 
+        self.checkpoint(key, page, done=True)
 
-class BitSearchParser:
+    def run(self):
+        """Crawl every pair; returns the number of results written"""
+        jobs = [(query, cat) for query in self.queries for cat in self.categories]
+        writer = ResultWriter(self.out_path)
+        pool = ParsePool(self.parse_workers)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+                futures = {executor.submit(self.crawl_one, query, cat, writer, pool): (query, cat)
+                           for query, cat in jobs}
+                for future in concurrent.futures.as_completed(futures):
+                    query, cat = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Left unfinished in the checkpoint, so the next run retries it
+                        METRICS.inc('errors_total')
+                        print(f"Error crawling '{query}' in {cat}: {str(e)}", file=sys.stderr)
+        finally:
+            writer.close()
+            pool.close()
+        return self.written
+
+
+class BitSearchParser(ResultParser):
     """
     HTML parser for bitsearch.to search results
     Based on actual website structure analysis
     """
 
-    def __init__(self):
-        self.results = []
+    # Byte patterns for parse_bytes; \s and DOTALL already span line breaks,
+    # so the page needs no whitespace normalisation. As in the str patterns,
+    # a title block may not run into the next <h3, tags and attribute values
+    # stop at the next angle bracket and numbers only match from the start
+    # of a digit run, which keeps matching linear on adversarial pages.
+    result_pattern_bytes = re.compile(
+        rb'<h3[^<>]*>(?:[^<]|<(?!h3))*?<a[^<>]*href="(/torrent/[^"<>]+)"[^<>]*>([^<]+)</a>(?:[^<]|<(?!h3))*?</h3>(.*?)(?=<h3|<div[^<>]*class="[^"<>]*pagination|$)',
+        re.DOTALL | re.IGNORECASE)
+    magnet_pattern_bytes = re.compile(rb'href="(magnet:[^"<>]+)"')
+    size_pattern_bytes = re.compile(rb'(?<!\d)(\d+(?:\.\d+)?)\s*([KMGT]?B)', re.IGNORECASE)
+    seeds_pattern_bytes = re.compile(rb'(?<!\d)(\d+)\s+seeders?', re.IGNORECASE)
+    leechers_pattern_bytes = re.compile(rb'(?<!\d)(\d+)\s+leechers?', re.IGNORECASE)
+    date_pattern_bytes = re.compile(rb'(\d{1,2}/\d{1,2}/\d{4})')
 
-    def parse_html(self, html_content):
+    def parse_html(self, html_content, encoding='utf-8'):
         """Parse search results using regex patterns based on actual site structure"""
+        if isinstance(html_content, (bytes, bytearray, memoryview)):
+            self.parse_bytes(html_content, encoding)
+            return
+
+        try:
+            with METRICS.timer('parse_seconds'):
+                # Clean up HTML content
+                html_content = html_content.replace('\n', ' ').replace('\r', ' ')
+
+                # Extract torrent results based on actual bitsearch.to structure
+                self.extract_bitsearch_results(html_content)
+
+        except Exception as e:
+            METRICS.inc('errors_total')
+            print(f"Error in HTML parsing: {str(e)}", file=sys.stderr)
+
+    def parse_bytes(self, data, encoding='utf-8'):
+        """
+        Parse a raw response body (bytes, bytearray or memoryview) without
+        decoding or copying the page: the byte patterns run over the buffer
+        in place and only the extracted fields are decoded and unescaped.
+        """
+        try:
+            with METRICS.timer('parse_seconds'):
+                self.extract_bitsearch_results_bytes(data, encoding)
+        except Exception as e:
+            METRICS.inc('errors_total')
+            print(f"Error in HTML parsing: {str(e)}", file=sys.stderr)
+
+    def parse_batch(self, data, batch=None, encoding='utf-8'):
+        """
+        Collect a page's results into a ResultBatch (a new one unless batch
+        is given) without building any dicts: fields are located in the raw
+        body and only numbers are converted. Returns the batch.
+        """
+        if isinstance(data, str):
+            data = data.encode(encoding)
+        if batch is None:
+            batch = ResultBatch(encoding)
+        page = batch.add_page(data)
+        units = {unit.encode('ascii'): index for index, unit in enumerate(ResultBatch.UNITS)}
+        found = 0
+
         try:
-            # Clean up HTML content
-            html_content = html_content.replace('\n', ' ').replace('\r', ' ')
+            with METRICS.timer('parse_seconds'):
+                for match in self.result_pattern_bytes.finditer(data):
+                    start, end = match.span(3)
+                    magnet_match = self.magnet_pattern_bytes.search(data, start, end)
+                    if not magnet_match or not match.group(2).strip():
+                        continue
 
-            # Extract torrent results based on actual bitsearch.to structure
-            self.extract_bitsearch_results(html_content)
+                    size_value, size_unit = -1.0, -1
+                    size_match = self.size_pattern_bytes.search(data, start, end)
+                    if size_match:
+                        size_value = float(size_match.group(1))
+                        size_unit = units[size_match.group(2).upper()]
+                    seeds_match = self.seeds_pattern_bytes.search(data, start, end)
+                    leechers_match = self.leechers_pattern_bytes.search(data, start, end)
+                    date_match = self.date_pattern_bytes.search(data, start, end)
 
+                    batch.append(page, match.span(2), match.span(1), magnet_match.span(1),
+                                 date_match.span(1) if date_match else (-1, -1), size_value, size_unit,
+                                 int(seeds_match.group(1)) if seeds_match else -1,
+                                 int(leechers_match.group(1)) if leechers_match else -1)
+                    found += 1
         except Exception as e:
-            import sys
+            METRICS.inc('errors_total')
             print(f"Error in HTML parsing: {str(e)}", file=sys.stderr)
 
+        # Pages the main pattern misses go through the regular fallback
+        if not found:
+            METRICS.inc('fallback_parser_total')
+            self.used_fallback = True
+            html_content = html.unescape(bytes(data).decode(encoding, 'replace'))
+            self.extract_fallback_results(html_content.replace('\n', ' ').replace('\r', ' '))
+            for result in self.results:
+                batch.append_result(result)
+        return batch
+
+    def extract_bitsearch_results_bytes(self, data, encoding='utf-8'):
+        """Byte-level twin of extract_bitsearch_results"""
+
+        def text(raw):
+            value = raw.decode(encoding, 'replace')
+            return html.unescape(value) if '&' in value else value
+
+        for match in self.result_pattern_bytes.finditer(data):
+            # Search the result's own block in place instead of slicing it out
+            start, end = match.span(3)
+
+            result = {
+                'link': '',
+                'name': text(match.group(2)).replace('\n', ' ').replace('\r', ' ').strip(),
+                'size': '-1',
+                'seeds': '-1',
+                'leech': '-1',
+                'engine_url': 'https://bitsearch.to',
+                'desc_link': 'https://bitsearch.to' + text(match.group(1)),
+                'pub_date': '-1'
+            }
+
+            magnet_match = self.magnet_pattern_bytes.search(data, start, end)
+            if magnet_match:
+                result['link'] = text(magnet_match.group(1))
+
+            size_match = self.size_pattern_bytes.search(data, start, end)
+            if size_match:
+                size_bytes = self.parse_size(f"{size_match.group(1).decode('ascii')} "
+                                             f"{size_match.group(2).decode('ascii')}")
+                if size_bytes > 0:
+                    result['size'] = str(size_bytes)
+
+            seeds_match = self.seeds_pattern_bytes.search(data, start, end)
+            if seeds_match:
+                result['seeds'] = seeds_match.group(1).decode('ascii')
+
+            leechers_match = self.leechers_pattern_bytes.search(data, start, end)
+            if leechers_match:
+                result['leech'] = leechers_match.group(1).decode('ascii')
+
+            date_match = self.date_pattern_bytes.search(data, start, end)
+            if date_match:
+                timestamp = self.parse_date(date_match.group(1).decode('ascii'))
+                if timestamp > 0:
+                    result['pub_date'] = str(timestamp)
+
+            # Only add if we have essential data
+            if result['name'] and result['link']:
+                self.results.append(result)
+
+        # The fallback is rare enough to run on a decoded copy
+        if not self.results:
+            METRICS.inc('fallback_parser_total')
+            self.used_fallback = True
+            html_content = html.unescape(bytes(data).decode(encoding, 'replace'))
+            self.extract_fallback_results(html_content.replace('\n', ' ').replace('\r', ' '))
+
+    def parse_details(self, html_content, encoding='utf-8'):
+        """Extract size and date from a torrent detail page (str or raw bytes)"""
+        details = {}
+        if isinstance(html_content, (bytes, bytearray, memoryview)):
+            html_content = bytes(html_content).decode(encoding, 'replace')
+        html_content = html_content.replace('\n', ' ').replace('\r', ' ')
+
+        size_match = re.search(r'(?<!\d)(\d+(?:\.\d+)?)\s*([KMGT]?B)\b', html_content, re.IGNORECASE)
+        if size_match:
+            size_bytes = self.parse_size(f"{size_match.group(1)} {size_match.group(2)}")
+            if size_bytes > 0:
+                details['size'] = str(size_bytes)
+
+        date_match = re.search(r'(\d{1,2}/\d{1,2}/\d{4}|\d{4}-\d{2}-\d{2})', html_content)
+        if date_match:
+            timestamp = self.parse_date(date_match.group(1))
+            if timestamp > 0:
+                details['pub_date'] = str(timestamp)
+
+        return details
+
     def extract_bitsearch_results(self, html_content):
         """Extract results from bitsearch.to specific HTML structure"""
 
         # Pattern to match each torrent result block
         # Based on the actual structure: h3 with title link, followed by stats and magnet/torrent links
-        result_pattern = r'<h3[^>]*>.*?<a[^>]*href="(/torrent/[^"]+)"[^>]*>([^<]+)</a>.*?</h3>(.*?)(?=<h3|<div[^>]*class="[^"]*pagination|$)'
+        # The title part never runs into the next <h3, so unclosed headings cannot make matching cubic
+        result_pattern = r'<h3[^<>]*>(?:[^<]|<(?!h3))*?<a[^<>]*href="(/torrent/[^"<>]+)"[^<>]*>([^<]+)</a>(?:[^<]|<(?!h3))*?</h3>(.*?)(?=<h3|<div[^<>]*class="[^"<>]*pagination|$)'
 
         matches = re.findall(result_pattern, html_content, re.DOTALL | re.IGNORECASE)
 
@@ -127,12 +2669,12 @@ class BitSearchParser:
             }
 
             # Extract magnet link from the content block
-            magnet_match = re.search(r'href="(magnet:[^"]+)"', content_block)
+            magnet_match = re.search(r'href="(magnet:[^"<>]+)"', content_block)
             if magnet_match:
                 result['link'] = magnet_match.group(1)
 
             # Extract file size - look for patterns like "1.95 GB", "4.59 GB"
-            size_match = re.search(r'(\d+(?:\.\d+)?)\s*([KMGT]?B)', content_block, re.IGNORECASE)
+            size_match = re.search(r'(?<!\d)(\d+(?:\.\d+)?)\s*([KMGT]?B)', content_block, re.IGNORECASE)
             if size_match:
                 size_str = f"{size_match.group(1)} {size_match.group(2)}"
                 size_bytes = self.parse_size(size_str)
@@ -140,11 +2682,11 @@ class BitSearchParser:
                     result['size'] = str(size_bytes)
 
             # Extract seeds and leechers - look for patterns like "28 seeders 41 leechers"
-            seeds_match = re.search(r'(\d+)\s+seeders?', content_block, re.IGNORECASE)
+            seeds_match = re.search(r'(?<!\d)(\d+)\s+seeders?', content_block, re.IGNORECASE)
             if seeds_match:
                 result['seeds'] = seeds_match.group(1)
 
-            leechers_match = re.search(r'(\d+)\s+leechers?', content_block, re.IGNORECASE)
+            leechers_match = re.search(r'(?<!\d)(\d+)\s+leechers?', content_block, re.IGNORECASE)
             if leechers_match:
                 result['leech'] = leechers_match.group(1)
 
@@ -161,32 +2703,34 @@ class BitSearchParser:
 
         # If the main pattern didn't work, try fallback extraction
         if not self.results:
+            METRICS.inc('fallback_parser_total')
+            self.used_fallback = True
             self.extract_fallback_results(html_content)
 
     def extract_fallback_results(self, html_content):
         """Fallback method to extract results if main pattern fails"""
 
         # Find all magnet links
-        magnet_pattern = r'href="(magnet:[^"]+)"'
+        magnet_pattern = r'href="(magnet:[^"<>]+)"'
         magnets = re.findall(magnet_pattern, html_content)
 
         # Find all torrent titles (look for links to /torrent/ pages)
-        title_pattern = r'<a[^>]*href="/torrent/[^"]*"[^>]*>([^<]+)</a>'
+        title_pattern = r'<a[^<>]*href="/torrent/[^"<>]*"[^<>]*>([^<]+)</a>'
         titles = re.findall(title_pattern, html_content, re.IGNORECASE)
 
         # Find all file sizes
-        size_pattern = r'(\d+(?:\.\d+)?)\s*([KMGT]?B)'
+        size_pattern = r'(?<!\d)(\d+(?:\.\d+)?)\s*([KMGT]?B)'
         sizes = re.findall(size_pattern, html_content, re.IGNORECASE)
 
         # Find seeds and leechers
-        seeds_pattern = r'(\d+)\s+seeders?'
+        seeds_pattern = r'(?<!\d)(\d+)\s+seeders?'
         seeds = re.findall(seeds_pattern, html_content, re.IGNORECASE)
 
-        leechers_pattern = r'(\d+)\s+leechers?'
+        leechers_pattern = r'(?<!\d)(\d+)\s+leechers?'
         leechers = re.findall(leechers_pattern, html_content, re.IGNORECASE)
 
         # Find description links
-        desc_pattern = r'href="(/torrent/[^"]+)"'
+        desc_pattern = r'href="(/torrent/[^"<>]+)"'
         desc_links = re.findall(desc_pattern, html_content)
 
         # Combine results (match by index, assuming they appear in the same order)
@@ -269,4 +2813,56 @@ class BitSearchParser:
             return -1
 
         except:
-            return -1
\ No newline at end of file
+            return -1
+
+
+def main(argv=None):
+    """Command line entry point for the long-running modes"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='BitSearch.to plugin tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    watch = commands.add_parser('watch', help='poll a watchlist and append new results to a JSONL file')
+    watch.add_argument('watchlist', help='JSON list of {query, category, interval, prewarm}')
+    watch.add_argument('--out', required=True, help='JSONL file receiving new results')
+    watch.add_argument('--concurrency', type=int, default=2)
+    watch.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this port')
+
+    crawl = commands.add_parser('crawl', help='crawl every page of many queries into JSONL or CSV')
+    crawl.add_argument('queries', help='file with one query per line')
+    crawl.add_argument('--out', required=True, help='.jsonl, .csv, optionally .gz')
+    crawl.add_argument('--categories', default='all',
+                       help="comma-separated categories, or 'every' for all supported ones")
+    crawl.add_argument('--max-pages', type=int, default=50)
+    crawl.add_argument('--concurrency', type=int, default=4)
+    crawl.add_argument('--parse-workers', type=int, default=0,
+                       help='parse pages in this many worker processes')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'watch':
+        if args.metrics_port:
+            METRICS.serve(args.metrics_port)
+        poller = WatchlistPoller.from_file(args.watchlist, JsonlSink(args.out),
+                                           max_concurrency=args.concurrency)
+        try:
+            poller.run()
+        except KeyboardInterrupt:
+            poller.stop()
+
+    elif args.command == 'crawl':
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+        if args.categories == 'every':
+            categories = list(bitsearch.supported_categories)
+        else:
+            categories = args.categories.split(',')
+        crawler = Crawler(queries, args.out, categories=categories, max_pages=args.max_pages,
+                          max_concurrency=args.concurrency, parse_workers=args.parse_workers)
+        print(f"Wrote {crawler.run()} results to {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
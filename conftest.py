@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# Make the plugin and its stubs importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plugin_stubs import install_plugin_stubs
+
+install_plugin_stubs()
+
+
+@pytest.fixture(autouse=True)
+def isolated_state_dir(tmp_path, monkeypatch):
+    """Keep breaker, cache and index files out of the user's cache directory"""
+    monkeypatch.setenv('BITSEARCH_STATE_DIR', str(tmp_path / 'state'))
+
+
+@pytest.fixture
+def run_search(monkeypatch):
+    """
+    Run a search and return the emitted results. With a transport, the
+    plugin (a fresh bitsearch by default) gets a fetcher serving pages
+    from it, without hedging or rate limiting.
+    """
+    def run(transport=None, what='ubuntu', cat='all', plugin=None, **kwargs):
+        import bitsearch
+        emitted = []
+        monkeypatch.setattr(bitsearch, 'prettyPrinter', emitted.append)
+        plugin = plugin or bitsearch.bitsearch()
+        if transport is not None:
+            plugin.fetcher = bitsearch.PageFetcher(transport=transport, hedge=False,
+                                                   limiter=bitsearch.HostRateLimiter(rate=1000, capacity=100))
+        plugin.search(what, cat, **kwargs)
+        return emitted
+
+    return run
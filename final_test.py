@@ -190,6 +190,7 @@ def test_plugin_usability():
         importlib.reload(bs_module)
 
         plugin = bs_module.bitsearch()
+        plugin.fetcher.transport = lambda url, timeout=None: MockHelpers.retrieve_url(url)
         plugin.search("ubuntu", "all")
 
         if captured_output:
@@ -0,0 +1,31 @@
+"""
+Stand-ins for the modules qBittorrent provides to search plugins, so that
+bitsearch can be imported by the tests and benchmarks outside qBittorrent
+"""
+
+import sys
+
+
+class MockHelpers:
+    @staticmethod
+    def retrieve_url(url):
+        """Mock retrieve_url - the tests serve pages through the fetcher"""
+        return ""
+
+    @staticmethod
+    def download_file(info):
+        """Mock download_file"""
+        return f"/tmp/mock_torrent {info}"
+
+
+class MockNovaPrinter:
+    @staticmethod
+    def prettyPrinter(result_dict):
+        """Mock prettyPrinter - results are captured by the tests instead"""
+        pass
+
+
+def install_plugin_stubs():
+    """Let bitsearch be imported outside qBittorrent, keeping stubs already installed"""
+    sys.modules.setdefault('helpers', MockHelpers())
+    sys.modules.setdefault('novaprinter', MockNovaPrinter())
@@ -60,6 +60,7 @@ def test_plugin():
 
     # Create plugin instance
     plugin = bitsearch()
+    plugin.fetcher.transport = lambda url, timeout=None: MockHelpers.retrieve_url(url)
 
     # Test search
     print("Search results:", file=sys.stderr)
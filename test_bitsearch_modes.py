@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Tests for the bitsearch.py search modes: top-K, the local result index,
+new-since-last-run monitoring, the watchlist poller, the crawler,
+detail-page enrichment, bulk downloads and multi-engine search
+Usage: python -m pytest test_bitsearch_modes.py
+"""
+
+import os
+import csv
+import gzip
+import hashlib
+import json
+import urllib.parse
+import threading
+import time
+
+import pytest
+
+import bitsearch as bitsearch_module
+from bitsearch import (BitSearchParser, Crawler, HostRateLimiter, JsonlSink, PageFetcher, ResultIndex,
+                       ResultWriter, SeenSet, WatchlistPoller)
+
+
+def make_row(name, seeds, leech=1, size='1.5 GB', date='4/18/2019'):
+    """One result block in bitsearch.to markup; the infohash derives from the name"""
+    infohash = hashlib.sha1(name.encode('utf-8')).hexdigest().upper()
+    return f'''
+<h3><a href="/torrent/{infohash[:24].lower()}">{name}</a></h3>
+Other/DiskImage {size} {date}
+{seeds} seeders {leech} leechers 10 downloads
+<a href="magnet:?xt=urn:btih:{infohash}&dn={name}">Magnet</a>
+'''
+
+
+def make_page(rows):
+    return ''.join(make_row(*row) for row in rows)
+
+
+class PagedSite:
+    """Serves a fixed list of pages and records the requested URLs"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.urls = []
+
+    def transport(self, url, timeout=None):
+        self.urls.append(url)
+        page = 1
+        if '&page=' in url:
+            page = int(url.split('&page=')[1].split('&')[0])
+        return self.pages[page - 1] if page <= len(self.pages) else ''
+
+
+SEEDER_SORTED_PAGES = [
+    make_page([('a', 100), ('b', 90), ('c', 80)]),
+    make_page([('d', 70), ('e', 60)]),
+    make_page([('f', 50)]),
+]
+
+
+def test_top_k_stops_paginating(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    emitted = run_search(site.transport, top_k=2)
+
+    assert [r['name'] for r in emitted] == ['a', 'b']
+    assert len(site.urls) == 1
+    assert 'sort=seeders' in site.urls[0]
+
+
+def test_top_k_keeps_paginating_until_full(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    emitted = run_search(site.transport, top_k=4)
+
+    assert [r['seeds'] for r in emitted] == ['100', '90', '80', '70']
+    assert len(site.urls) == 2
+
+
+def test_top_k_with_custom_score(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    emitted = run_search(site.transport, top_k=2, score=lambda r: -int(r['seeds']))
+
+    # A custom score is not monotonic in the page order, so every page is read
+    assert [r['name'] for r in emitted] == ['f', 'e']
+    assert len(site.urls) == 3
+
+
+def test_search_without_top_k_emits_everything(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    emitted = run_search(site.transport)
+
+    assert len(emitted) == 6
+    assert 'sort=' not in site.urls[0]
+
+
+def parsed(rows):
+    parser = BitSearchParser()
+    parser.parse_html(make_page(rows))
+    return parser.results
+
+
+def test_index_upserts_latest_stats(tmp_path):
+    index = ResultIndex(str(tmp_path / 'index.sqlite3'))
+    index.add(parsed([('ubuntu-22.04-desktop.iso', 10), ('debian-12-netinst.iso', 5)]))
+    index.add(parsed([('ubuntu-22.04-desktop.iso', 42)]))
+
+    assert len(index) == 2
+    hits = index.search('ubuntu desktop')
+    assert [(r['name'], r['seeds']) for r in hits] == [('ubuntu-22.04-desktop.iso', '42')]
+    assert set(hits[0]) == {'link', 'name', 'size', 'seeds', 'leech', 'engine_url', 'desc_link', 'pub_date'}
+    assert index.search('fedora') == []
+
+
+def test_index_imports_jsonl_dump(tmp_path):
+    dump = tmp_path / 'dump.jsonl.gz'
+    with gzip.open(dump, 'wt', encoding='utf-8') as f:
+        for result in parsed([('a-ubuntu', 1), ('b-ubuntu', 3), ('c-debian', 2)]):
+            f.write(json.dumps(result) + '\n')
+
+    index = ResultIndex(str(tmp_path / 'index.sqlite3'))
+    assert index.import_jsonl(str(dump), batch_size=2) == 3
+    assert [r['name'] for r in index.search('ubuntu')] == ['b-ubuntu', 'a-ubuntu']
+
+
+def test_live_search_feeds_index(monkeypatch, run_search):
+    monkeypatch.setattr(bitsearch_module.bitsearch, 'use_index', True)
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    run_search(site.transport, what='a')
+
+    plugin = bitsearch_module.bitsearch()
+    assert len(plugin.index) == 6
+
+
+def test_search_from_index_with_background_refresh(run_search):
+    plugin = bitsearch_module.bitsearch()
+    plugin.index = plugin.open_index()
+    plugin.index.add(parsed([('ubuntu-old', 5)]))
+
+    site = PagedSite([make_page([('ubuntu-old', 7), ('ubuntu-new', 3)])])
+    emitted = run_search(site.transport, plugin=plugin, from_index=True)
+    assert [r['name'] for r in emitted] == ['ubuntu-old']
+    assert site.urls == []
+
+    emitted = run_search(site.transport, plugin=plugin, from_index=True, refresh=True)
+    plugin.refresh_thread.join(5)
+
+    # The index answer comes first; the refresh adds only the unseen result
+    assert [r['name'] for r in emitted] == ['ubuntu-old', 'ubuntu-new']
+    assert [r['seeds'] for r in plugin.index.search('ubuntu')] == ['7', '3']
+
+
+def test_seen_set_round_trip(tmp_path):
+    path = str(tmp_path / 'query.seen')
+    seen = SeenSet(path)
+    seen.add('D540FC48EB12F2833163EED6421D449DD8F1CE1F')
+    seen.add('https://bitsearch.to/torrent/no-infohash')
+    seen.save()
+
+    reloaded = SeenSet(path)
+    assert len(reloaded) == 2
+    assert os.path.getsize(path) == 40
+    assert 'd540fc48eb12f2833163eed6421d449dd8f1ce1f' in reloaded
+    assert 'https://bitsearch.to/torrent/no-infohash' in reloaded
+    assert 'A7838B75C42B612DA3B6CC99BEED4ECB2D04CFF2' not in reloaded
+
+
+def test_new_only_emits_unseen_results(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    first = run_search(site.transport, new_only=True)
+    assert len(first) == 6
+    assert 'sort=date' in site.urls[0]
+
+    # One new upload on top; page 2 is entirely known, so page 3 is skipped
+    site = PagedSite([make_page([('g', 1), ('a', 100), ('b', 90)])] + SEEDER_SORTED_PAGES[1:])
+    second = run_search(site.transport, new_only=True)
+    assert [r['name'] for r in second] == ['g']
+    assert len(site.urls) == 2
+
+    # Seen sets are per query
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    assert len(run_search(site.transport, what='debian', new_only=True)) == 6
+
+
+def test_filtered_out_page_does_not_end_pagination(run_search):
+    pages = [make_page([('bad-a', 100), ('bad-b', 95)]), make_page([('c', 80), ('d', 70)]),
+             make_page([('e', 60)])]
+
+    top = run_search(PagedSite(pages).transport, top_k=2, exclude=['bad'])
+    assert [r['name'] for r in top] == ['c', 'd']
+
+    new = run_search(PagedSite(pages).transport, new_only=True, exclude=['bad'])
+    assert [r['name'] for r in new] == ['c', 'd', 'e']
+
+
+def test_new_only_rejects_top_k(run_search):
+    site = PagedSite([make_page([('a', 100), ('b', 90)]), make_page([('c', 80), ('d', 70)]),
+                      make_page([('e', 60)])])
+    # A top 3 would leave d unreturned behind the all-known first page
+    with pytest.raises(ValueError):
+        run_search(site.transport, new_only=True, top_k=3)
+    assert site.urls == []
+
+    assert [r['name'] for r in run_search(site.transport, new_only=True)] == ['a', 'b', 'c', 'd', 'e']
+
+
+def site_plugin(site):
+    """Factory for plugins fetching from site, as the poller creates its own"""
+    def factory():
+        plugin = bitsearch_module.bitsearch()
+        plugin.fetcher = PageFetcher(transport=site.transport, hedge=False,
+                                     limiter=HostRateLimiter(rate=1000, capacity=100))
+        return plugin
+    return factory
+
+
+def test_watchlist_writes_new_results_and_prewarms(tmp_path, run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    out = tmp_path / 'new.jsonl'
+    poller = WatchlistPoller([('ubuntu', 'all', 60, True), {'query': 'debian', 'category': 'tv'}],
+                             JsonlSink(str(out)), plugin_factory=site_plugin(site))
+    poller.run_once()
+    poller.run_once()
+
+    lines = [json.loads(line) for line in out.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == 12
+    assert {line['name'] for line in lines} == set('abcdef')
+
+    # The prewarmed plain search is now answered from the page cache
+    fetched = len(site.urls)
+    emitted = run_search(site.transport, what='ubuntu')
+    assert len(emitted) == 6
+    assert len(site.urls) == fetched
+
+
+def test_watchlist_prewarms_before_cached_pages_expire(tmp_path):
+    poller = WatchlistPoller([('ubuntu', 'all', 900, True), ('debian', 'all', 900)],
+                             JsonlSink(str(tmp_path / 'new.jsonl')))
+    prewarmed, plain = poller.entries
+
+    assert poller.cache_ttl == bitsearch_module.bitsearch.cache_ttl
+    assert poller.next_run(prewarmed, 0) < poller.cache_ttl
+    assert poller.interval(plain) == 900
+
+
+def test_watchlist_runs_on_jittered_intervals(tmp_path):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    polled = []
+    poller = WatchlistPoller([('ubuntu', 'all', 0.05)], JsonlSink(str(tmp_path / 'new.jsonl')),
+                             plugin_factory=site_plugin(site))
+    poller.poll = polled.append
+
+    thread = threading.Thread(target=poller.run)
+    thread.start()
+    time.sleep(0.3)
+    poller.stop()
+    thread.join(2)
+
+    assert not thread.is_alive()
+    assert 3 <= len(polled) <= 8
+
+
+def test_crawler_streams_compressed_jsonl(tmp_path):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    out = str(tmp_path / 'crawl.jsonl.gz')
+    crawler = Crawler(['ubuntu', 'debian'], out, categories=['all', 'software'],
+                      plugin=site_plugin(site)())
+    assert crawler.run() == 24
+
+    with gzip.open(out, 'rt', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 24
+    assert {(row['query'], row['category']) for row in rows} == {
+        ('ubuntu', 'all'), ('ubuntu', 'software'), ('debian', 'all'), ('debian', 'software')}
+    # Three pages plus the empty fourth that ends each walk
+    assert len(site.urls) == 16
+    assert any('category=apps' in url for url in site.urls)
+
+
+def test_crawler_resumes_from_checkpoint(tmp_path):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    out = str(tmp_path / 'crawl.csv')
+    interrupted = {'done': False}
+
+    def flaky_transport(url, timeout=None):
+        if 'debian' in url and '&page=2' in url and not interrupted['done']:
+            interrupted['done'] = True
+            raise bitsearch_module.FetchError('interrupted')
+        return site.transport(url, timeout)
+
+    plugin = site_plugin(site)()
+    plugin.fetcher.transport = flaky_transport
+    assert Crawler(['ubuntu', 'debian'], out, max_concurrency=1, parse_workers=2, plugin=plugin).run() == 9
+
+    site.urls.clear()
+    assert Crawler(['ubuntu', 'debian'], out, max_concurrency=1, plugin=plugin).run() == 3
+    # Only the unfinished walk is continued, from page 2
+    assert [url.split('&page=')[-1] for url in site.urls] == ['2', '3', '4']
+
+    with open(out, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 12
+    assert rows[0]['query'] == 'ubuntu'
+
+
+def test_compressed_output_survives_a_killed_crawl(tmp_path):
+    out = str(tmp_path / 'crawl.jsonl.gz')
+    writer = ResultWriter(out)
+    writer.write([{'name': 'first'}])
+    writer.close()
+    # A run killed halfway through a write leaves an unfinished member behind
+    with open(out, 'ab') as f:
+        f.write(gzip.compress(b'{"name": "lost"}\n' * 100)[:-20])
+
+    writer = ResultWriter(out)
+    writer.write([{'name': 'second'}])
+    writer.write([{'name': 'third'}])
+    writer.close()
+
+    with gzip.open(out, 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['name'] for line in f] == ['first', 'second', 'third']
+
+
+def test_resume_checks_members_across_read_chunks(monkeypatch, tmp_path):
+    out = str(tmp_path / 'crawl.jsonl.gz')
+    writer = ResultWriter(out)
+    for i in range(50):
+        writer.write([{'name': f'row {i}'}])
+    writer.close()
+    with open(out, 'ab') as f:
+        f.write(gzip.compress(b'{"name": "lost"}\n')[:-4])
+
+    # Members and read chunks fall on different boundaries
+    monkeypatch.setattr(ResultWriter, 'chunk_size', 7)
+    ResultWriter(out).close()
+
+    with gzip.open(out, 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['name'] for line in f] == [f'row {i}' for i in range(50)]
+
+
+def make_incomplete_row(name, seeds):
+    """A row without size or date; the infohash avoids digits so nothing looks like a size"""
+    infohash = hashlib.sha1(name.encode('utf-8')).hexdigest().upper()
+    infohash = infohash.translate(str.maketrans('0123456789', 'GHIJKLMNOP'))
+    return f'''
+<h3><a href="/torrent/{name}">{name}</a></h3>
+Other/DiskImage
+{seeds} seeders 1 leechers
+<a href="magnet:?xt=urn:btih:{infohash}">Magnet</a>
+'''
+
+
+class DetailSite(PagedSite):
+    """PagedSite that also serves detail pages, slowly for names in `slow`"""
+
+    def __init__(self, pages, slow=()):
+        super().__init__(pages)
+        self.slow = slow
+
+    def transport(self, url, timeout=None):
+        if '/torrent/' not in url:
+            return super().transport(url, timeout)
+        self.urls.append(url)
+        if url.rsplit('/', 1)[-1] in self.slow:
+            time.sleep(1)
+        return '<dl><dt>Size</dt><dd>2.5 GB</dd><dt>Uploaded</dt><dd>2023-01-15</dd></dl>'
+
+
+def test_enrichment_completes_missing_fields(run_search):
+    page = make_row('complete', 50) + make_incomplete_row('partial', 40)
+    site = DetailSite([page])
+    emitted = run_search(site.transport, enrich=True)
+
+    by_name = {r['name']: r for r in emitted}
+    assert by_name['partial']['size'] == str(int(2.5 * 1024 ** 3))
+    assert by_name['partial']['pub_date'] != '-1'
+    # Only the incomplete result needed its detail page
+    assert [url for url in site.urls if '/torrent/' in url] == ['https://bitsearch.to/torrent/partial']
+
+    # Detail pages are cached by desc_link
+    site.urls.clear()
+    run_search(site.transport, enrich=True, cached=False)
+    assert not [url for url in site.urls if '/torrent/' in url]
+
+
+def test_enrichment_respects_deadline(run_search):
+    page = make_incomplete_row('fast', 40) + make_incomplete_row('slow', 30)
+    site = DetailSite([page], slow=('slow',))
+    start = time.monotonic()
+    emitted = run_search(site.transport, enrich=True, deadline_ms=400)
+
+    assert time.monotonic() - start < 0.8
+    by_name = {r['name']: r for r in emitted}
+    assert set(by_name) == {'fast', 'slow'}
+    assert by_name['fast']['size'] != '-1'
+    assert by_name['slow']['size'] == '-1'
+
+
+def test_enrichment_uses_a_fixed_pool_of_workers(run_search):
+    page = ''.join(make_incomplete_row(f'partial{chr(97 + i)}', 40) for i in range(12))
+    site = DetailSite([page])
+    workers = set()
+
+    def detail_transport(url, timeout=None):
+        if '/torrent/' in url:
+            workers.add(threading.get_ident())
+            time.sleep(0.02)
+        return DetailSite.transport(site, url, timeout)
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.enrich_concurrency = 3
+    site.transport = detail_transport
+    emitted = run_search(site.transport, plugin=plugin, enrich=True)
+
+    assert len(emitted) == 12
+    assert all(result['size'] != '-1' for result in emitted)
+    # Twelve incomplete results are drained by three threads, not one thread each
+    assert len(workers) <= 3
+
+
+TORRENT_BODY = b'd8:announce22:http://tracker.test/an4:infod6:lengthi42e4:name8:test.isoee'
+
+
+def test_bulk_download_writes_valid_torrents(monkeypatch, tmp_path, capsys):
+    requested = []
+
+    def fake_get_bytes(url, timeout):
+        requested.append(url)
+        if 'broken' in url:
+            return b'<html>Not found</html>', 'utf-8'
+        return TORRENT_BODY, None
+
+    monkeypatch.setattr(bitsearch_module, 'http_get_bytes', fake_get_bytes)
+    plugin = bitsearch_module.bitsearch()
+    magnet = 'magnet:?xt=urn:btih:D540FC48EB12F2833163EED6421D449DD8F1CE1F'
+    infos = [magnet, 'https://bitsearch.to/a.torrent', 'https://bitsearch.to/broken.torrent',
+             'https://bitsearch.to/b.torrent']
+    directory = tmp_path / 'torrents'
+    reports = plugin.download_torrents(infos, directory=str(directory))
+
+    assert sorted(requested) == sorted(infos[1:])
+    assert [report['info'] for report in reports] == infos
+    assert reports[0]['path'] == magnet and reports[0]['seconds'] == 0.0
+    assert reports[2]['path'] is None and 'bencoded' in reports[2]['error']
+    for report in (reports[1], reports[3]):
+        assert report['error'] is None and report['bytes'] == len(TORRENT_BODY)
+        assert report['seconds'] >= 0
+        with open(report['path'], 'rb') as f:
+            assert f.read() == TORRENT_BODY
+    assert sorted(os.listdir(directory)) == sorted(os.path.basename(r['path']) for r in (reports[1], reports[3]))
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == f"{magnet} {magnet}"
+    assert lines[1] == f"{reports[1]['path']} {infos[1]}"
+
+
+def test_single_download_short_circuits_magnets(capsys):
+    magnet = 'magnet:?xt=urn:btih:ABC'
+    bitsearch_module.bitsearch().download_torrent(magnet)
+    assert capsys.readouterr().out.strip() == f"{magnet} {magnet}"
+
+
+class JsonParser(bitsearch_module.ResultParser):
+    """Parser of a stand-in engine answering with JSON lists"""
+
+    def parse_html(self, html_content):
+        for item in json.loads(html_content):
+            self.results.append({
+                'link': f"magnet:?xt=urn:btih:{item['hash']}",
+                'name': item['title'],
+                'size': str(item['bytes']),
+                'seeds': str(item['seeders']),
+                'leech': '0',
+                'desc_link': '-1',
+                'pub_date': '-1'
+            })
+
+
+class JsonEngine(bitsearch_module.Engine):
+    url = 'http://json-engine.test'
+    name = 'JSON stand-in'
+    pages = 2
+
+    def page_url(self, what, cat='all', page=1, sort=None):
+        return f"{self.url}/api?q={urllib.parse.quote_plus(what)}&page={page}"
+
+    def new_parser(self):
+        return JsonParser()
+
+
+def json_item(name, seeds):
+    return {'hash': hashlib.sha1(name.encode('utf-8')).hexdigest().upper(), 'title': name.upper(),
+            'bytes': 1024, 'seeders': seeds}
+
+
+def test_multi_engine_merges_by_infohash_and_ranks_by_seeds():
+    fast = HostRateLimiter(rate=1000, capacity=100)
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher = PageFetcher(transport=PagedSite(SEEDER_SORTED_PAGES).transport, hedge=False, limiter=fast)
+    json_site = PagedSite([json.dumps([json_item('b', 95), json_item('c', 5), json_item('x', 85)]),
+                           json.dumps([json_item('y', 1), json_item('x', 85)])])
+    engine = JsonEngine(PageFetcher(transport=json_site.transport, hedge=False, limiter=fast))
+
+    emitted = []
+    count = bitsearch_module.MultiSearch([plugin, engine]).search('ubuntu', sink=emitted.append)
+
+    assert count == len(emitted) == 8
+    assert [result['seeds'] for result in emitted] == ['100', '95', '85', '80', '70', '60', '50', '1']
+    # The better-seeded copy of a shared infohash wins
+    assert emitted[1]['name'] == 'B' and emitted[1]['engine_url'] == JsonEngine.url
+    assert emitted[3]['name'] == 'c' and emitted[3]['engine_url'] == 'https://bitsearch.to'
+    assert len(json_site.urls) == 2
+
+
+def test_multi_engine_survives_a_failing_engine(capsys):
+    engine = JsonEngine(PageFetcher(transport=lambda url, timeout=None: '{', hedge=False,
+                                    limiter=HostRateLimiter(rate=1000, capacity=100)))
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher = PageFetcher(transport=PagedSite(SEEDER_SORTED_PAGES[2:]).transport, hedge=False,
+                                 limiter=HostRateLimiter(rate=1000, capacity=100))
+
+    emitted = []
+    bitsearch_module.MultiSearch([engine, plugin]).search('ubuntu', sink=emitted.append)
+
+    assert [result['name'] for result in emitted] == ['f']
+    assert 'Error searching JSON stand-in page 1' in capsys.readouterr().err
+
+
+def test_search_reads_the_configured_number_of_pages(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    plugin = bitsearch_module.bitsearch()
+    plugin.pages = 2
+    emitted = run_search(site.transport, plugin=plugin, top_k=10)
+
+    assert len(emitted) == 5
+    assert site.urls == [plugin.page_url('ubuntu', 'all', page, 'seeders') for page in (1, 2)]
+
+
+def test_multi_engine_applies_filters_top_k_and_new_only():
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher = PageFetcher(transport=site.transport, hedge=False,
+                                 limiter=HostRateLimiter(rate=1000, capacity=100))
+    multi = bitsearch_module.MultiSearch([plugin])
+
+    emitted = []
+    multi.search('ubuntu', sink=emitted.append, min_seeds=60, exclude=['b'], top_k=3, new_only=True)
+    assert [result['name'] for result in emitted] == ['a', 'c', 'd']
+
+    # Only what was emitted counts as seen
+    emitted.clear()
+    multi.search('ubuntu', sink=emitted.append, min_seeds=60, new_only=True)
+    assert [result['name'] for result in emitted] == ['b', 'e']
+
+
+def test_filters_cut_results_and_pages(run_search):
+    site = PagedSite(SEEDER_SORTED_PAGES)
+    emitted = run_search(site.transport, min_seeds=75, exclude=['B'])
+
+    assert [result['name'] for result in emitted] == ['a', 'c']
+    # Seeder-sorted: page 2 already holds results below 75 seeds, so page 3 is never requested
+    assert len(site.urls) == 2
+    assert all('&sort=seeders' in url for url in site.urls)
+
+
+def test_size_filters_keep_paginating(run_search):
+    pages = [make_page([('small', 10, 1, '700 MB'), ('big', 5, 1, '4 GB')]),
+             make_page([('medium', 3, 1, '1.5 GB')])]
+    site = PagedSite(pages)
+    emitted = run_search(site.transport, min_size=1024 ** 3, max_size=2 * 1024 ** 3)
+
+    assert [result['name'] for result in emitted] == ['medium']
+    assert len(site.urls) == 3
+    assert not any('&sort=' in url for url in site.urls)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for the bitsearch.py bulk parsing paths: process-pool parsing and
+byte-level parsing of raw response bodies and columnar result batches
+Usage: python -m pytest test_bitsearch_parsing.py
+"""
+
+import pickle
+
+SAMPLE_HTML = '''
+<h3><a href="/torrent/5cb8afc48700981f3e5b00c4">ubuntu-19.04-desktop-amd64.iso</a></h3>
+Other/DiskImage 1.95 GB 4/18/2019
+28 seeders 41 leechers 1403 downloads
+<a href="magnet:?xt=urn:btih:D540FC48EB12F2833163EED6421D449DD8F1CE1F&dn=ubuntu-19.04">Magnet</a>
+
+<h3><a href="/torrent/63f864e1ae697358dc80e874">ubuntu-22.04.2-desktop-amd64.iso</a></h3>
+Other/DiskImage 4.59 GB 2/24/2023
+177 seeders 331 leechers 5833 downloads
+<a href="magnet:?xt=urn:btih:A7838B75C42B612DA3B6CC99BEED4ECB2D04CFF2&dn=ubuntu-22.04.2">Magnet</a>
+'''
+
+import bitsearch as bitsearch_module
+from bitsearch import BitSearchParser, ParsePool, ResultFilter, parse_records, record_to_result
+
+
+def reference_results(html_content):
+    parser = BitSearchParser()
+    parser.parse_html(html_content)
+    return parser.results
+
+
+def test_records_are_compact_and_round_trip():
+    records, seconds, used_fallback = parse_records(SAMPLE_HTML)
+
+    assert all(isinstance(record, tuple) for record in records)
+    assert seconds >= 0 and not used_fallback
+    assert len(pickle.dumps(records)) < len(pickle.dumps(reference_results(SAMPLE_HTML)))
+    assert [record_to_result(record) for record in records] == reference_results(SAMPLE_HTML)
+
+
+def test_process_pool_matches_inline_parsing():
+    pages = [SAMPLE_HTML, SAMPLE_HTML.replace('28 seeders', '30 seeders'), '']
+    expected = [reference_results(page) for page in pages]
+
+    pool = ParsePool(2)
+    try:
+        # Workers are started up front, not forked later from a fetch thread
+        assert pool.executor._processes
+        assert [pool.parse(page) for page in pages] == expected
+        assert [[record_to_result(r) for r in records] for records in pool.map(pages)] == expected
+    finally:
+        pool.close()
+
+    inline = ParsePool(0)
+    assert [inline.parse(page) for page in pages] == expected
+
+
+def test_bytes_parsing_matches_str_parsing():
+    expected = reference_results(SAMPLE_HTML)
+    body = SAMPLE_HTML.encode('utf-8')
+
+    for raw in (body, bytearray(body), memoryview(body), body.replace(b'\n', b'\r\n')):
+        parser = BitSearchParser()
+        parser.parse_html(raw)
+        assert parser.results == expected
+
+
+def test_bytes_parsing_decodes_only_fields():
+    body = SAMPLE_HTML.replace('ubuntu-19.04-desktop-amd64.iso', 'Ubuntu &amp; Friends \u00e9dition')
+    body = body.replace('&dn=ubuntu-19.04', '&amp;dn=ubuntu-19.04').encode('utf-8')
+
+    parser = BitSearchParser()
+    parser.parse_bytes(body)
+
+    assert parser.results[0]['name'] == 'Ubuntu & Friends \u00e9dition'
+    assert parser.results[0]['link'].endswith('&dn=ubuntu-19.04')
+    assert parser.results[0]['seeds'] == '28'
+
+
+def test_bytes_parsing_uses_fallback():
+    parser = BitSearchParser()
+    parser.parse_bytes(b'<a href="/torrent/abc">Title</a> <a href="magnet:?xt=urn:btih:ABC">M</a>')
+    assert parser.used_fallback
+    assert parser.results[0]['name'] == 'Title'
+
+
+def test_pool_accepts_raw_bodies():
+    records, _, _ = parse_records(SAMPLE_HTML.encode('utf-8'))
+    assert [record_to_result(record) for record in records] == reference_results(SAMPLE_HTML)
+
+
+def test_batch_materializes_like_per_dict_parsing():
+    body = SAMPLE_HTML.replace('1.95 GB', '1.95 gb').encode('utf-8')
+    expected = reference_results(body)
+
+    batch = BitSearchParser().parse_batch(body)
+    assert len(batch) == 2
+    assert batch.results() == expected
+
+    # Several pages accumulate in one batch, str pages included
+    BitSearchParser().parse_batch(SAMPLE_HTML, batch)
+    assert batch.results() == expected + reference_results(SAMPLE_HTML)
+
+
+def test_batch_filters_and_sorts_before_materializing():
+    third = SAMPLE_HTML.split('\n\n')[0].replace('5cb8afc48700981f3e5b00c4', 'ffff').replace(
+        '1.95 GB', '700 MB').replace('28 seeders', '90 seeders').replace('D540FC', '000000')
+    batch = BitSearchParser().parse_batch(SAMPLE_HTML + third)
+
+    assert [r['seeds'] for r in batch.sort_by_seeds().results()] == ['177', '90', '28']
+    assert [r['seeds'] for r in batch.filter(ResultFilter(min_seeds=50)).results()] == ['177', '90']
+    assert batch.below_min_seeds
+    assert [r['seeds'] for r in batch.filter(ResultFilter(max_size=2 * 1024 ** 3)).results()] == ['90']
+    assert batch.results()[0]['size'] == str(700 * 1024 ** 2)
+
+    batch = BitSearchParser().parse_batch(SAMPLE_HTML).filter(ResultFilter(min_size=2 * 1024 ** 3, min_seeds=0))
+    assert [r['name'] for r in batch.results()] == ['ubuntu-22.04.2-desktop-amd64.iso']
+    assert not batch.below_min_seeds
+
+    batch = BitSearchParser().parse_batch(SAMPLE_HTML + third).filter(ResultFilter(exclude=['22.04']))
+    assert [r['seeds'] for r in batch.sort_by_seeds().limit(1).results()] == ['90']
+
+
+def test_batch_takes_fallback_results():
+    page = '<a href="/torrent/abc">Title</a> 3 seeders <a href="magnet:?xt=urn:btih:ABC">M</a>'
+    parser = BitSearchParser()
+    batch = parser.parse_batch(page)
+
+    assert parser.used_fallback
+    assert batch.results() == reference_results(page)
+    assert len(batch.filter(ResultFilter(min_seeds=5))) == 0
+
+
+def test_filters_run_before_results_are_built(monkeypatch):
+    dates = []
+    # final_test.py reloads the plugin, so patch the class the plugin uses now
+    monkeypatch.setattr(bitsearch_module.BitSearchParser, 'parse_date', lambda self, date: dates.append(date) or 1)
+    plugin = bitsearch_module.bitsearch()
+
+    for page in (SAMPLE_HTML, SAMPLE_HTML.encode('utf-8')):
+        dates.clear()
+        result_page = plugin.parse_page(page, ResultFilter(min_seeds=100))
+        assert [r['seeds'] for r in result_page.results] == ['177']
+        assert result_page.below_min_seeds
+        # The rejected result never had its date parsed
+        assert dates == ['2/24/2023']
+
+    result_page = plugin.parse_page(SAMPLE_HTML, ResultFilter(exclude=['UBUNTU-22'], max_size=3 * 1024 ** 3))
+    assert [r['seeds'] for r in result_page.results] == ['28']
+    assert not result_page.below_min_seeds
+
+    # Everything filtered out is not a reason to try the fallback parser
+    assert plugin.parse_page(SAMPLE_HTML, ResultFilter(min_seeds=1000)).results == []
+
+    # Engines without batches filter their result dicts the same way
+    result_page = bitsearch_module.Engine.parse_page(plugin, SAMPLE_HTML, ResultFilter(min_seeds=100))
+    assert [r['seeds'] for r in result_page.results] == ['177'] and result_page.below_min_seeds
@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""
+Tests for the bitsearch.py fetch pipeline: metrics, rate limiting, retries,
+the circuit breaker, hedged requests, search deadlines, adaptive
+timeouts, recorded HTTP fixtures and the shared page cache
+Usage: python -m pytest test_bitsearch_pipeline.py
+"""
+
+import sys
+import os
+import gzip
+import json
+import subprocess
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_HTML = '''
+<h3><a href="/torrent/5cb8afc48700981f3e5b00c4">ubuntu-19.04-desktop-amd64.iso</a></h3>
+Other/DiskImage 1.95 GB 4/18/2019
+28 seeders 41 leechers 1403 downloads
+<a href="magnet:?xt=urn:btih:D540FC48EB12F2833163EED6421D449DD8F1CE1F">Magnet</a>
+
+<h3><a href="/torrent/63f864e1ae697358dc80e874">ubuntu-22.04.2-desktop-amd64.iso</a></h3>
+Other/DiskImage 4.59 GB 2/24/2023
+177 seeders 331 leechers 5833 downloads
+<a href="magnet:?xt=urn:btih:A7838B75C42B612DA3B6CC99BEED4ECB2D04CFF2">Magnet</a>
+'''
+
+import bitsearch as bitsearch_module
+from bitsearch import (BitSearchParser, CircuitBreaker, HostRateLimiter, LatencyTracker, MetricsRegistry,
+                       PageFetcher, RetryBudget, TokenBucket, parse_retry_after)
+
+
+def mock_transport(url, timeout=None):
+    """Serves the same page for every URL"""
+    return PAGE_HTML
+
+
+class StandInServer:
+    """
+    Local stand-in for bitsearch.to: answers the first `throttle` requests
+    with 429 and Retry-After, then serves PAGE_HTML
+    """
+
+    def __init__(self, throttle=0, retry_after='0'):
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append((time.monotonic(), self.path))
+                if len(stand_in.requests) <= stand_in.throttle:
+                    self.send_response(429)
+                    self.send_header('Retry-After', stand_in.retry_after)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = PAGE_HTML.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_metrics_fed_by_search(monkeypatch, run_search):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    emitted = run_search(mock_transport)
+
+    # Every page returns the same two torrents; plain searches pass them all on
+    assert len(emitted) == 6
+    assert registry.values['searches_total'] == 1
+    assert registry.values['pages_fetched_total'] == 3
+    assert registry.values['results_emitted_total'] == 6
+    assert registry.values['duplicates_dropped_total'] == 0
+    assert registry.observations['fetch_seconds']['count'] == 3
+    assert registry.observations['parse_seconds']['count'] == 3
+
+
+def test_metrics_count_fallback_parser(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    parser = BitSearchParser()
+    parser.parse_html('<a href="/torrent/abc">Title</a> <a href="magnet:?xt=urn:btih:ABC">M</a>')
+
+    assert len(parser.results) == 1
+    assert registry.values['fallback_parser_total'] == 1
+
+
+def test_metrics_prometheus_export(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc('errors_total', 2)
+    registry.observe('fetch_seconds', 0.2)
+    registry.observe('fetch_seconds', 20)
+
+    text = registry.render()
+    assert 'bitsearch_errors_total 2' in text
+    assert 'bitsearch_fetch_seconds_bucket{le="0.25"} 1' in text
+    assert 'bitsearch_fetch_seconds_bucket{le="+Inf"} 2' in text
+    assert 'bitsearch_fetch_seconds_count 2' in text
+
+    path = tmp_path / 'bitsearch.prom'
+    registry.write_textfile(str(path))
+    assert path.read_text(encoding='utf-8') == text
+
+
+def test_metrics_http_endpoint():
+    import urllib.request
+
+    registry = MetricsRegistry()
+    registry.inc('searches_total')
+    server = registry.serve(port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'bitsearch_searches_total 1' in body
+
+
+def test_retry_after_parsing():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('') is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # One burst token, then five more at 50/s
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_adapts_to_throttling():
+    bucket = TokenBucket(rate=4, capacity=2, min_rate=1, recovery=0.5)
+    bucket.throttled()
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == 1
+    bucket.succeeded()
+    assert bucket.rate == 1.5
+
+
+def test_search_recovers_from_429(monkeypatch, run_search):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    with StandInServer(throttle=2, retry_after='0') as server:
+        plugin = bitsearch_module.bitsearch()
+        plugin.url = server.url
+        plugin.fetcher = PageFetcher(limiter=HostRateLimiter(rate=100, capacity=3), base_delay=0.01)
+        emitted = run_search(plugin=plugin)
+
+    assert len(emitted) == 6
+    assert registry.values['throttled_total'] == 2
+    assert registry.values['retries_total'] == 2
+    assert registry.values['pages_fetched_total'] == 3
+    # Counted by the transport from the bodies on the wire; 429s had none
+    assert registry.values['bytes_downloaded_total'] == 3 * len(PAGE_HTML.encode('utf-8'))
+
+
+def test_failed_page_counts_one_error(monkeypatch, run_search):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    def unreachable(url, timeout=None):
+        raise OSError('connection refused')
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher = PageFetcher(transport=unreachable, hedge=False, base_delay=0.001,
+                                 limiter=HostRateLimiter(rate=1000, capacity=100))
+    plugin.pages = 1
+    assert run_search(plugin=plugin) == []
+
+    # The page fails after 4 attempts: the retries are counted, the page once
+    assert registry.values['retries_total'] == 3
+    assert registry.values['errors_total'] == 1
+
+
+def test_default_transport_parses_raw_bodies(monkeypatch, run_search):
+    parsed = []
+    # final_test.py reloads the plugin, so patch the class the plugin uses now
+    parser_class = bitsearch_module.BitSearchParser
+    parse_batch = parser_class.parse_batch
+
+    def spy(parser, data, *args, **kwargs):
+        parsed.append(type(data))
+        return parse_batch(parser, data, *args, **kwargs)
+
+    monkeypatch.setattr(parser_class, 'parse_batch', spy)
+    with StandInServer() as server:
+        plugin = bitsearch_module.bitsearch()
+        plugin.url = server.url
+        plugin.fetcher = PageFetcher(hedge=False, limiter=HostRateLimiter(rate=1000, capacity=100))
+        emitted = run_search(plugin=plugin)
+
+    # Pages go from the socket to the byte-level parser without being decoded
+    assert parsed == [bytes] * 3
+    assert len(emitted) == 6
+    # Other charsets are transcoded so the parser always sees UTF-8
+    assert bitsearch_module.utf8_body('café'.encode('latin-1'), 'ISO-8859-1') == 'café'.encode('utf-8')
+
+
+def test_retry_honours_retry_after():
+    with StandInServer(throttle=1, retry_after='1') as server:
+        fetcher = PageFetcher(limiter=HostRateLimiter(rate=100, capacity=3), base_delay=0.01)
+        body = fetcher.fetch(server.url + '/search?q=ubuntu')
+        (first, _), (second, _) = server.requests
+
+    assert b'ubuntu-19.04' in body
+    assert second - first >= 1.0
+
+
+def test_retry_budget_is_shared_by_a_search():
+    with StandInServer(throttle=100) as server:
+        fetcher = PageFetcher(limiter=HostRateLimiter(rate=1000, capacity=100), base_delay=0.001)
+        budget = RetryBudget(max_retries=2)
+        for page in range(2):
+            try:
+                fetcher.fetch(f"{server.url}/search?q=x&page={page}", budget)
+            # final_test.py reloads the plugin, so look the class up at call time
+            except bitsearch_module.FetchError as e:
+                assert e.status == 429
+
+    # First page: 1 attempt + 2 retries, second page: budget already spent
+    assert len(server.requests) == 4
+
+
+def test_limiter_shared_between_concurrent_searches():
+    limiter = HostRateLimiter(rate=20, capacity=1)
+    with StandInServer() as server:
+        fetcher = PageFetcher(limiter=limiter)
+        threads = [
+            threading.Thread(target=fetcher.fetch, args=(f"{server.url}/search?q={i}",))
+            for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        times = sorted(t for t, _ in server.requests)
+
+    assert len(limiter.buckets) == 1
+    assert times[-1] - times[0] >= 0.15
+
+
+def failing_transport(url, timeout=None):
+    raise OSError('connection refused')
+
+
+def test_circuit_breaker_persists_across_invocations(tmp_path):
+    path = str(tmp_path / 'breaker.json')
+    url = 'https://bitsearch.to/search?q=ubuntu'
+
+    breaker = CircuitBreaker(path, failure_threshold=2, cooldown=300)
+    breaker.record_failure(url)
+    assert breaker.allow(url)
+    breaker.record_failure(url)
+
+    # A fresh instance, as in the next plugin process, sees the open circuit
+    assert CircuitBreaker(path, failure_threshold=2, cooldown=300).state(url) == 'open'
+    assert not CircuitBreaker(path, failure_threshold=2, cooldown=300).allow(url)
+
+
+def test_circuit_breaker_lets_one_probe_through(tmp_path):
+    path = str(tmp_path / 'breaker.json')
+    url = 'https://bitsearch.to/search?q=ubuntu'
+
+    breaker = CircuitBreaker(path, failure_threshold=1, cooldown=0)
+    breaker.record_failure(url)
+    assert breaker.state(url) == 'half_open'
+    assert breaker.allow(url)
+    assert not CircuitBreaker(path, failure_threshold=1, cooldown=0).allow(url)
+
+    breaker.record_success(url)
+    assert breaker.state(url) == 'closed'
+    assert breaker.allow(url)
+
+
+def test_open_circuit_fails_fast(monkeypatch, run_search):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+    calls = []
+
+    def counting_transport(url, timeout=None):
+        calls.append(url)
+        return failing_transport(url, timeout)
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher.transport = counting_transport
+    plugin.fetcher.limiter = HostRateLimiter(rate=1000, capacity=100)
+    plugin.fetcher.max_attempts = 1
+    run_search(plugin=plugin)
+    assert len(calls) == 3
+
+    # The next invocation does not touch the network at all
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher.transport = counting_transport
+    emitted = run_search(plugin=plugin)
+    assert emitted == []
+    assert len(calls) == 3
+    assert registry.values['circuit_open_total'] == 1
+
+
+def test_missing_pages_do_not_open_the_circuit(tmp_path):
+    statuses = []
+
+    def status_transport(url, timeout=None):
+        raise urllib.error.HTTPError(url, statuses[-1], 'Error', None, None)
+
+    breaker = CircuitBreaker(str(tmp_path / 'breaker.json'), failure_threshold=3, cooldown=300)
+    fetcher = PageFetcher(transport=status_transport, breaker=breaker, max_attempts=1, hedge=False,
+                          limiter=HostRateLimiter(rate=1000, capacity=100))
+
+    def fetch_all(status, count):
+        statuses.append(status)
+        for page in range(count):
+            try:
+                fetcher.fetch(f"https://bitsearch.to/torrent/{page}")
+            except bitsearch_module.FetchError as e:
+                assert e.status == status
+
+    # Detail pages or .torrent URLs that 404 say nothing about the host
+    fetch_all(404, 5)
+    assert breaker.state('https://bitsearch.to/') == 'closed'
+    assert breaker.load() == {}
+
+    # Server errors still count against it
+    fetch_all(503, 3)
+    assert breaker.state('https://bitsearch.to/') == 'open'
+
+
+def test_open_circuit_serves_stale_pages(monkeypatch, run_search):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher.transport = mock_transport
+    plugin.fetcher.limiter = HostRateLimiter(rate=1000, capacity=100)
+    assert len(run_search(plugin=plugin)) == 6
+
+    for _ in range(3):
+        plugin.fetcher.breaker.record_failure(plugin.url)
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher.transport = failing_transport
+    emitted = run_search(plugin=plugin)
+    assert len(emitted) == 6
+    assert registry.values['cache_hits_total'] == 3
+
+
+def test_search_survives_failed_state_writes(monkeypatch, tmp_path, run_search):
+    def disk_full(path, data):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(bitsearch_module, 'write_atomic', disk_full)
+    assert len(run_search(mock_transport)) == 6
+
+    # A state directory that cannot be created leaves the plugin without cache or breaker
+    blocker = tmp_path / 'not-a-directory'
+    blocker.write_text('')
+    monkeypatch.setenv('BITSEARCH_STATE_DIR', str(blocker / 'state'))
+    plugin = bitsearch_module.bitsearch()
+    assert plugin.cache is None and plugin.fetcher.breaker is None
+    assert len(run_search(mock_transport, plugin=plugin)) == 6
+
+
+def slow_primary_transport(url, timeout=None):
+    """The primary host takes half a second, the mirror answers at once"""
+    if 'bitsearch.to' in url:
+        time.sleep(0.5)
+        return 'primary'
+    return 'mirror'
+
+
+def test_hedged_request_races_mirror(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+
+    fetcher = PageFetcher(transport=slow_primary_transport, limiter=HostRateLimiter(rate=1000, capacity=100),
+                          mirrors=['https://mirror.example'], hedge_delay=0.05, latency=LatencyTracker())
+    start = time.monotonic()
+    assert fetcher.fetch('https://bitsearch.to/search?q=ubuntu') == 'mirror'
+
+    assert time.monotonic() - start < 0.4
+    assert fetcher.hedges == fetcher.hedges_won == 1
+    assert registry.values['hedges_fired_total'] == 1
+    assert registry.values['hedges_won_total'] == 1
+
+
+def test_hedge_delay_follows_latency_percentile():
+    latency = LatencyTracker()
+    fetcher = PageFetcher(latency=latency, hedge_delay=1.0)
+    url = 'https://bitsearch.to/search?q=ubuntu'
+    assert fetcher.hedge_after(url) == 1.0
+
+    for i in range(100):
+        latency.observe(url, (i + 1) / 100)
+    assert fetcher.hedge_after(url) == 0.96
+
+
+def test_hedging_is_capped():
+    fetcher = PageFetcher(transport=slow_primary_transport, limiter=HostRateLimiter(rate=1000, capacity=100),
+                          hedge_delay=0.05, hedge_ratio=0, hedge_burst=1, latency=LatencyTracker())
+    for page in range(3):
+        assert fetcher.fetch(f"https://bitsearch.to/search?q=ubuntu&page={page}") == 'primary'
+
+    assert fetcher.requests == 3
+    assert fetcher.hedges == 1
+    assert fetcher.hedges_won == 0
+
+
+def test_deadline_emits_partial_results(run_search):
+    timeouts = []
+
+    def slow_later_pages(url, timeout=None):
+        timeouts.append(timeout)
+        if 'page=' in url:
+            time.sleep(1)
+        return PAGE_HTML
+
+    plugin = bitsearch_module.bitsearch()
+    plugin.fetcher = PageFetcher(transport=slow_later_pages, hedge=False,
+                                 limiter=HostRateLimiter(rate=1000, capacity=100))
+    start = time.monotonic()
+    emitted = run_search(plugin=plugin, deadline_ms=300)
+
+    assert time.monotonic() - start < 0.8
+    assert len(emitted) == 2
+    # Every fetch timeout, connect and read, is bounded by what was left of the 300ms budget
+    assert all(0 < part <= 0.3 for timeout in timeouts for part in timeout)
+
+
+def test_deadline_stops_retries():
+    with StandInServer(throttle=100, retry_after='5') as server:
+        fetcher = PageFetcher(limiter=HostRateLimiter(rate=1000, capacity=100), hedge=False)
+        start = time.monotonic()
+        try:
+            fetcher.fetch(server.url + '/search?q=ubuntu', deadline=bitsearch_module.Deadline(500))
+        except bitsearch_module.FetchError:
+            pass
+        elapsed = time.monotonic() - start
+
+    # Waiting out Retry-After would overrun the deadline, so no retry is made
+    assert elapsed < 0.5
+    assert len(server.requests) == 1
+
+
+def test_timeouts_adapt_to_latency_history(tmp_path):
+    path = str(tmp_path / 'latency.json')
+    tracker = LatencyTracker(path=path)
+    url = 'https://bitsearch.to/search?q=ubuntu'
+    assert tracker.timeouts(url) == (LatencyTracker.connect_ceiling, LatencyTracker.read_ceiling)
+
+    # Fast host: floors apply
+    for _ in range(20):
+        tracker.observe(url, 0.1)
+    assert tracker.timeouts(url) == (LatencyTracker.connect_floor, LatencyTracker.read_floor)
+
+    # A slow tail raises the read timeout, but never past the ceiling
+    for _ in range(5):
+        tracker.observe(url, 4.0)
+    connect, read = tracker.timeouts(url)
+    assert LatencyTracker.connect_floor < connect < LatencyTracker.connect_ceiling
+    assert read == 12.0
+    tracker.observe(url, 60.0)
+    assert tracker.timeouts(url)[1] == LatencyTracker.read_ceiling
+
+    # History survives into the next plugin run
+    tracker.save()
+    assert LatencyTracker(path=path).timeouts(url) == tracker.timeouts(url)
+    assert LatencyTracker(path=path).timeouts('https://other.test/') == tracker.timeouts('https://other.test/')
+
+
+class DribbleServer:
+    """Answers after `delay` seconds, then sends the body in `chunks` spaced `gap` seconds apart"""
+
+    def __init__(self, delay=0.0, chunks=1, gap=0.0):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(delay)
+                self.send_response(200)
+                self.send_header('Content-Length', str(chunks))
+                self.end_headers()
+                for _ in range(chunks):
+                    self.wfile.write(b'x')
+                    self.wfile.flush()
+                    time.sleep(gap)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_read_timeout_abandons_stuck_fetch_only():
+    stuck = DribbleServer(delay=2.0)
+    dribbling = DribbleServer(chunks=5, gap=0.1)
+    try:
+        start = time.monotonic()
+        try:
+            bitsearch_module.http_get_bytes(stuck.url, (1.0, 0.2))
+            assert False, "stuck fetch should time out"
+        except OSError:
+            pass
+        assert time.monotonic() - start < 1.0
+
+        # Slower overall than the read timeout, but never silent for that long
+        body, _ = bitsearch_module.http_get_bytes(dribbling.url, (1.0, 0.3))
+        assert body == b'xxxxx'
+    finally:
+        stuck.close()
+        dribbling.close()
+
+
+def test_fixtures_replay_a_recorded_search(monkeypatch, tmp_path, run_search):
+    path = str(tmp_path / 'fixtures.jsonl.gz')
+    with StandInServer(throttle=1, retry_after='0') as server:
+        plugin = bitsearch_module.bitsearch()
+        plugin.url = server.url
+        plugin.fetcher = PageFetcher(transport=bitsearch_module.FixtureTransport(path, 'record'), hedge=False,
+                                     limiter=HostRateLimiter(rate=1000, capacity=100), base_delay=0.01)
+        recorded = run_search(plugin=plugin, cached=False)
+        requests = len(server.requests)
+
+    # The server is gone: everything, the 429 included, comes from the archive
+    registry = MetricsRegistry()
+    monkeypatch.setattr(bitsearch_module, 'METRICS', registry)
+    monkeypatch.setenv('BITSEARCH_FIXTURES', path)
+    plugin = bitsearch_module.bitsearch()
+    plugin.url = server.url
+    replay = plugin.fetcher.transport
+    plugin.fetcher = PageFetcher(transport=replay, hedge=False, base_delay=0.01,
+                                 limiter=HostRateLimiter(rate=1000, capacity=100))
+    replayed = run_search(plugin=plugin, cached=False)
+
+    assert len(recorded) == 6
+    assert replayed == recorded
+    assert registry.values['throttled_total'] == 1
+    assert sum(replay.replayed.values()) == requests == 4
+
+
+def test_fixtures_reproduce_latency(tmp_path):
+    path = str(tmp_path / 'fixtures.jsonl.gz')
+    with StandInServer() as server:
+        recorder = bitsearch_module.FixtureTransport(path, 'record')
+        recorder(server.url + '/search?q=ubuntu')
+        recorder(server.url + '/search?q=debian')
+
+    # Pretend the first page was slow when recorded
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    entries[0]['seconds'] = 0.3
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.writelines(json.dumps(entry) + '\n' for entry in entries)
+
+    fast = bitsearch_module.FixtureTransport(path)
+    slow = bitsearch_module.FixtureTransport(path, reproduce_latency=True)
+    for transport, bounds in ((fast, (0, 0.1)), (slow, (0.3, 1.0))):
+        start = time.monotonic()
+        body = transport(server.url + '/search?q=ubuntu')
+        assert bounds[0] <= time.monotonic() - start < bounds[1]
+        assert b'ubuntu-19.04-desktop-amd64.iso' in body
+
+    try:
+        fast(server.url + '/search?q=fedora')
+        assert False, "unrecorded URL should not be replayed"
+    except LookupError:
+        pass
+
+
+def test_shared_cache_round_trip_and_lru(tmp_path):
+    path = str(tmp_path / 'pages.mmap')
+    cache = bitsearch_module.SharedPageCache(path, slots=2, ways=2, slot_size=1024)
+    assert cache.get('https://bitsearch.to/a') is None
+
+    cache.put('https://bitsearch.to/a', b'page a')
+    cache.put('https://bitsearch.to/b', b'page b')
+    cache.put('https://bitsearch.to/a', b'page a2')
+    time.sleep(0.01)
+    assert cache.get('https://bitsearch.to/a') == b'page a2'
+    assert cache.get('https://bitsearch.to/a', max_age=60) == b'page a2'
+    assert cache.get('https://bitsearch.to/a', max_age=-1) is None
+
+    # b was read least recently, so c takes its slot
+    cache.put('https://bitsearch.to/c', b'page c')
+    assert cache.get('https://bitsearch.to/b') is None
+    assert cache.get('https://bitsearch.to/c') == b'page c'
+    assert cache.get('https://bitsearch.to/a') == b'page a2'
+
+    # Pages that do not fit a slot are not cached
+    cache.put('https://bitsearch.to/big', os.urandom(2048))
+    assert cache.get('https://bitsearch.to/big') is None
+
+
+def test_shared_cache_skips_entries_being_written(tmp_path):
+    cache = bitsearch_module.SharedPageCache(str(tmp_path / 'pages.mmap'), slots=8, ways=8, slot_size=1024)
+    cache.put('https://bitsearch.to/a', b'page a')
+    slot = next(slot for slot in range(8) if cache.read_entry(slot)[0])
+    offset = cache.header_size + slot * cache.entry_size
+
+    # A writer that died halfway leaves an odd sequence number behind
+    sequence = cache.read_entry(slot)[0]
+    bitsearch_module.struct.pack_into('<Q', cache.mm, offset, sequence + 1)
+    assert cache.get('https://bitsearch.to/a') is None
+
+    # A changed body under an unchanged header fails the checksum
+    bitsearch_module.struct.pack_into('<Q', cache.mm, offset, sequence)
+    start = cache.data_offset + slot * cache.slot_size
+    cache.mm[start:start + 4] = b'XXXX'
+    assert cache.get('https://bitsearch.to/a') is None
+
+    cache.put('https://bitsearch.to/a', b'page a')
+    assert cache.get('https://bitsearch.to/a') == b'page a'
+
+
+def test_shared_cache_readers_never_see_torn_pages(tmp_path):
+    cache = bitsearch_module.SharedPageCache(str(tmp_path / 'pages.mmap'), slots=8, ways=8)
+    bodies = {b'A' * 30000, b'B' * 20000}
+    stop = threading.Event()
+    seen = []
+
+    def write():
+        while not stop.is_set():
+            for body in bodies:
+                cache.put('https://bitsearch.to/a', body)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            seen.append(cache.get('https://bitsearch.to/a'))
+    finally:
+        stop.set()
+        writer.join()
+
+    assert set(seen) - {None} <= bodies
+
+
+def test_shared_cache_serves_pages_fetched_by_another_process(monkeypatch, tmp_path, run_search):
+    monkeypatch.setattr(bitsearch_module.bitsearch, 'shared_cache', True)
+    plugin = bitsearch_module.bitsearch()
+    assert isinstance(plugin.cache, bitsearch_module.SharedPageCache)
+
+    # Another plugin process searches first and fills the shared cache
+    script = (
+        "import sys\n"
+        "sys.modules['helpers'] = type('helpers', (), {'download_file': None})\n"
+        "sys.modules['novaprinter'] = type('novaprinter', (), {'prettyPrinter': lambda result: None})\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+        "import bitsearch, test_bitsearch_pipeline as tests\n"
+        "bitsearch.bitsearch.shared_cache = True\n"
+        "plugin = bitsearch.bitsearch()\n"
+        "plugin.fetcher = bitsearch.PageFetcher(transport=tests.mock_transport, hedge=False)\n"
+        "plugin.search('ubuntu')\n")
+    subprocess.run([sys.executable, '-c', script], check=True, env=dict(os.environ))
+
+    plugin.fetcher = PageFetcher(transport=failing_transport, max_attempts=1, hedge=False)
+    assert len(run_search(plugin=plugin)) == 6
@@ -100,6 +100,7 @@ def test_plugin():
 
     # Create plugin instance
     plugin = bitsearch()
+    plugin.fetcher.transport = lambda url, timeout=None: MockHelpers.retrieve_url(url)
 
     # Test search (will use our mock that returns sample HTML)
     print("Search results:", file=sys.stderr)
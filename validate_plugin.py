@@ -7,8 +7,15 @@ This script performs comprehensive validation to ensure the plugin works correct
 import sys
 import os
 import re
+import json
+import time
+import subprocess
+import tracemalloc
 import importlib.util
 
+# Performance thresholds checked by validate_performance
+BUDGET_FILE = 'performance_budget.json'
+
 def validate_plugin_structure():
     """Validate the plugin file structure and requirements"""
     print("=== Validating Plugin Structure ===")
@@ -253,6 +260,173 @@ def validate_parsing_logic():
         print(f"❌ Error validating parsing logic: {e}")
         return False
 
+def synthetic_page(count):
+    """A result page in bitsearch.to list markup holding count results"""
+    blocks = ['<html><body><div class="container">']
+    for i in range(count):
+        blocks.append(f'''
+<li class="card search-result my-2">
+  <div class="info px-3 pt-2 pb-3">
+    <h3 class="title w-100 truncate"><a href="/torrent/{i:024x}">Synthetic.Release.{i}.1080p.x264</a></h3>
+    <div class="category-stats"><a href="/search?category=1&amp;subcat=2" class="category">Movies</a></div>
+    <div class="stats">
+      <div><img src="/icons/download.svg" alt="Size">{i % 50 + 1}.25 GB</div>
+      <div><img src="/icons/seeder.svg" alt="Seeder"><font color="#0AB49A">{i % 5000} seeders</font></div>
+      <div><img src="/icons/leecher.svg" alt="Leecher"><font color="#C35257">{i % 500} leechers</font></div>
+      <div><img src="/icons/calendar.svg" alt="Date">4/18/2019</div>
+    </div>
+  </div>
+  <div class="links center-flex px-3">
+    <a class="dl-torrent" href="magnet:?xt=urn:btih:{i:040X}&amp;dn=Synthetic.Release.{i}" title="Magnet">Magnet</a>
+  </div>
+</li>''')
+    blocks.append('<div class="pagination"><a href="?page=2">2</a></div></div></body></html>')
+    return ''.join(blocks)
+
+
+def adversarial_inputs(size):
+    """Inputs of about size characters aimed at regex backtracking in the parser"""
+    return {
+        'unclosed headings': '<h3><a href="/torrent/x">t</a>' * (size // 30),
+        'unterminated tags': '<h3' * (size // 3),
+        'unterminated links': '<h3>' + '<a href="/torrent/x' * (size // 20),
+        'unterminated magnets': 'href="magnet:x' * (size // 14),
+        'unterminated pagination': '<h3><a href="/torrent/x">t</a></h3>' + '<div class="x' * (size // 13),
+        'digit runs': '1' * size,
+        'digits without units': '1.5 ' * (size // 4),
+    }
+
+
+def run_isolated(script, timeout=60):
+    """Run script in a fresh interpreter with qBittorrent's modules mocked; returns its stdout"""
+    preamble = ("import sys, time\n"
+                "sys.modules['helpers'] = type('helpers', (), {'download_file': None, 'retrieve_url': None})\n"
+                "sys.modules['novaprinter'] = type('novaprinter', (), {'prettyPrinter': None})\n"
+                "sys.path.insert(0, '.')\n")
+    return subprocess.run([sys.executable, '-c', preamble + script], capture_output=True, text=True,
+                          check=True, timeout=timeout).stdout
+
+
+def validate_performance():
+    """Validate import time, parse throughput and memory against the repo budget"""
+    print("\n=== Validating Performance Budget ===")
+
+    try:
+        with open(BUDGET_FILE, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+    except Exception as e:
+        print(f"❌ Error reading {BUDGET_FILE}: {e}")
+        return False
+
+    passed = True
+
+    def check(label, value, limit, unit, higher_is_better=False):
+        nonlocal passed
+        ok = value >= limit if higher_is_better else value <= limit
+        bound = 'min' if higher_is_better else 'max'
+        print(f"{'✅' if ok else '❌'} {label}: {value:.3f} {unit} ({bound} {limit} {unit})")
+        passed = passed and ok
+
+    try:
+        # Mock the dependencies
+        class MockHelpers:
+            @staticmethod
+            def retrieve_url(url):
+                return ""
+
+            @staticmethod
+            def download_file(info):
+                return ""
+
+        class MockNovaPrinter:
+            @staticmethod
+            def prettyPrinter(result):
+                pass
+
+        sys.modules['helpers'] = MockHelpers()
+        sys.modules['novaprinter'] = MockNovaPrinter()
+
+        sys.path.insert(0, '.')
+        from bitsearch import BitSearchParser
+
+        # Both ways pages are parsed: interactive searches hand raw response
+        # bodies to parse_batch, the other modes decoded text to parse_html
+        def parse_text(html_content):
+            parser = BitSearchParser()
+            parser.parse_html(html_content)
+            return parser.results
+
+        def parse_bytes(body):
+            return BitSearchParser().parse_batch(body).results()
+
+        parsers = {'str': (parse_text, str), 'bytes': (parse_bytes, str.encode)}
+
+        # Import time in a fresh interpreter
+        output = run_isolated("start = time.perf_counter()\n"
+                              "import bitsearch\n"
+                              "print(time.perf_counter() - start)\n")
+        check("Import time", float(output.split()[-1]), budget['import_seconds'], 's')
+
+        # Throughput on a large synthetic page
+        count = budget['synthetic_page_results']
+        for name, (parse, prepare) in parsers.items():
+            page = prepare(synthetic_page(count))
+            start = time.perf_counter()
+            results = parse(page)
+            elapsed = time.perf_counter() - start
+            if len(results) != count:
+                print(f"❌ Parsed {len(results)} of {count} synthetic results from {name}")
+                passed = False
+            check(f"Parse throughput ({name})", len(page) / 1024 ** 2 / elapsed,
+                  budget['parse_megabytes_per_second'], 'MB/s', higher_is_better=True)
+
+        # Worst case over inputs built to trigger backtracking, in a child
+        # process so a catastrophic pattern fails the run instead of hanging it
+        limit = budget['adversarial_parse_seconds']
+        cases = [f"{label}, {name}" for label in adversarial_inputs(0) for name in parsers]
+        script = ("import validate_plugin\n"
+                  "from bitsearch import BitSearchParser\n"
+                  f"for label, html_content in validate_plugin.adversarial_inputs({budget['adversarial_input_kilobytes'] * 1024}).items():\n"
+                  "    start = time.perf_counter()\n"
+                  "    BitSearchParser().parse_html(html_content)\n"
+                  "    print(f'{time.perf_counter() - start} {label}, str', flush=True)\n"
+                  "    body = html_content.encode('utf-8')\n"
+                  "    start = time.perf_counter()\n"
+                  "    BitSearchParser().parse_batch(body).results()\n"
+                  "    print(f'{time.perf_counter() - start} {label}, bytes', flush=True)\n")
+        try:
+            output = run_isolated(script, timeout=10 + limit * 10 * len(cases))
+        except subprocess.TimeoutExpired as e:
+            output = e.stdout.decode('utf-8') if isinstance(e.stdout, bytes) else (e.stdout or '')
+            finished = [line.split(' ', 1)[1] for line in output.splitlines()]
+            hung = next(label for label in cases if label not in finished)
+            print(f"❌ Adversarial parse ({hung}) did not finish")
+            passed = False
+        else:
+            timings = [line.split(' ', 1) for line in output.splitlines()]
+            worst, worst_label = max((float(seconds), label) for seconds, label in timings)
+            check(f"Worst adversarial parse ({worst_label})", worst, limit, 's')
+
+        # Peak memory while parsing 1k results
+        for name, (parse, prepare) in parsers.items():
+            page = prepare(synthetic_page(1000))
+            tracemalloc.start()
+            try:
+                parse(page)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            check(f"Peak memory per 1k results ({name})", peak / 1024,
+                  budget['peak_kilobytes_per_1k_results'], 'KiB')
+
+    except Exception as e:
+        print(f"❌ Error validating performance: {e}")
+        return False
+
+    if passed:
+        print("✅ Performance budget validation passed")
+    return passed
+
 def main():
     """Run all validations"""
     print("Starting comprehensive bitsearch.py plugin validation...")
@@ -264,7 +438,8 @@ def main():
         validate_output_format,
         validate_error_handling,
         validate_url_construction,
-        validate_parsing_logic
+        validate_parsing_logic,
+        validate_performance
     ]
 
     results = []
@@ -286,7 +461,8 @@ def main():
         "Output Format",
         "Error Handling",
         "URL Construction",
-        "Parsing Logic"
+        "Parsing Logic",
+        "Performance Budget"
     ]
 
     for i, (name, result) in enumerate(zip(validation_names, results)):